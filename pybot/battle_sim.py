@@ -0,0 +1,108 @@
+"""Headless battle simulator: win rates and turn counts for every unit matchup.
+
+Runs complete battles between every pair of catalog units (and, with --user,
+the units in a player's inventory, buffs included) using the same rules as
+/fight, without Discord. Matchups are spread over a process pool.
+
+    python battle_sim.py [--battles 500] [--workers N] [--no-spells] [--user USER_ID] [--seed N]
+
+Rows are the unit attacking first (the player side), columns the unit going
+second (which gets the Second Player Shield), so the matrix isn't symmetric.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from discord_commands import battle_core, inventory
+from discord_commands.unit_catalog import all_units, get_unit, resolve_unit
+
+CHUNK_BATTLES = 250  # Battles per task sent to a worker
+
+
+def run_matchup(job):
+    """Worker: fight `count` battles of one pairing; returns (i, j, wins, losses, draws, total turns)."""
+    i, j, unit1, unit2, count, use_spells, max_turns, seed = job
+    random.seed(seed)
+    wins = losses = draws = turns = 0
+    for _ in range(count):
+        winner, taken = battle_core.simulate(unit1, unit2, use_spells, max_turns)
+        turns += taken
+        if winner == 0:
+            wins += 1
+        elif winner == 1:
+            losses += 1
+        else:
+            draws += 1
+    return i, j, wins, losses, draws, turns
+
+
+def inventory_units(user_id):
+    """(label, unit dict) for each distinct unit in a player's inventory."""
+    units = []
+    for stack in inventory.get_units(user_id):
+        template = get_unit(stack.unit_id)
+        buffed = any(stack.delta)
+        units.append((f"{template.name}{'+' if buffed else ''} ({user_id})", resolve_unit(stack)))
+    return units
+
+
+def print_matrix(title, labels, cells, fmt):
+    width = max(len(label) for label in labels)
+    print(f"\n{title}")
+    print(" " * width + " " + " ".join(f"{str(k):>7}" for k in range(len(labels))))
+    for r, label in enumerate(labels):
+        print(f"{label:>{width}} " + " ".join(fmt(cells[r][c]) for c in range(len(labels))))
+    print("Columns: " + ", ".join(f"{k}={label}" for k, label in enumerate(labels)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate battles between every pair of units.")
+    parser.add_argument("--battles", type=int, default=500, help="Battles per matchup (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: %(default)s)")
+    parser.add_argument("--max-turns", type=int, default=battle_core.MAX_TURNS, help="Turns before a battle is a draw (default: %(default)s)")
+    parser.add_argument("--no-spells", action="store_true", help="Only attack; by default each side casts a random spell every turn")
+    parser.add_argument("--user", action="append", default=[], help="Also include this user's inventory units (repeatable)")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed, so runs can be repeated (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    entries = [(unit.name, unit.to_dict()) for unit in all_units()]
+    for user_id in args.user:
+        entries.extend(inventory_units(user_id))
+    labels = [label for label, _ in entries]
+    n = len(entries)
+
+    jobs = []
+    for i, (_, unit1) in enumerate(entries):
+        for j, (_, unit2) in enumerate(entries):
+            for start in range(0, args.battles, CHUNK_BATTLES):
+                count = min(CHUNK_BATTLES, args.battles - start)
+                jobs.append((i, j, unit1, unit2, count, not args.no_spells, args.max_turns,
+                             random.Random(f"{args.seed}-{i}-{j}-{start}").getrandbits(64)))
+
+    wins = [[0] * n for _ in range(n)]
+    draws = [[0] * n for _ in range(n)]
+    turns = [[0] * n for _ in range(n)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for i, j, w, _, d, t in pool.map(run_matchup, jobs, chunksize=max(1, len(jobs) // (4 * (args.workers or 1)))):
+            wins[i][j] += w
+            draws[i][j] += d
+            turns[i][j] += t
+    elapsed = time.perf_counter() - started
+
+    total = n * n * args.battles
+    print_matrix("Win rate of the row unit going first", labels, wins,
+                 lambda w: f"{w / args.battles:>7.1%}")
+    print_matrix("Average turns", labels, turns,
+                 lambda t: f"{t / args.battles:>7.1f}")
+    total_draws = sum(map(sum, draws))
+    if total_draws:
+        print(f"\n{total_draws} battle(s) hit the {args.max_turns}-turn cap and were counted as draws")
+    print(f"\n{total:,} battles in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} battles/s, {args.workers} workers)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,20 @@ from discord_commands import gacha_commands
 from discord_commands import battle_commands
 from discord_commands import prestige_commands
 from discord_commands import quiz_commands
+from discord_commands import economy
+from discord_commands import storage
+from discord_commands import image_assets
+from discord_commands import image_variants
+from discord_commands import unit_catalog
 def setup_commands(client, GUILD_ID):
     """Set up all slash commands for the bot by calling modular registration functions"""
+    # Load shared game state once and start writing it back in the background
+    economy.load()
+    prestige_commands.load_prestige_index()
+    storage.start_background_flush()
+    unit_catalog.get_catalog()  # Read units.json now; later reload checks run in the background
+    image_variants.build_variants()
+    image_assets.setup(client)
     music_commands.register_music_commands(client, GUILD_ID)
     voice_commands.register_voice_commands(client, GUILD_ID)
     admin_commands.register_admin_commands(client, GUILD_ID)
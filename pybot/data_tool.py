@@ -0,0 +1,366 @@
+"""Import/export the game state between the legacy JSON files and the database.
+
+Both directions stream one record at a time, so memory stays flat no matter
+how big the inventory file is. Stop the bot before running it.
+
+    python data_tool.py import path/to/json_dir [--db game_state.db] [--drop-unknown]
+    python data_tool.py export path/to/json_dir [--db game_state.db]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from discord_commands import storage
+from discord_commands.inventory import UnitStack
+from discord_commands.unit_catalog import compact_units, resolve_unit
+
+CHUNK_SIZE = 1 << 16  # Bytes read from a JSON file at a time
+BATCH_SIZE = 500  # Records written per database transaction
+DELIMITERS = frozenset(",:]} \t\r\n")
+
+LEGACY_FILES = {
+    "points": os.path.basename(storage.POINTS_FILE),
+    "inventory": os.path.basename(storage.INVENTORY_FILE),
+    "prestige": os.path.basename(storage.PRESTIGE_FILE),
+    "active_units": os.path.basename(storage.ACTIVE_UNITS_FILE),
+    "boss": os.path.basename(storage.BOSS_FILE),
+}
+
+
+class JsonStream:
+    """Incremental reader for a JSON file whose top level is an object.
+
+    items() walks an object's keys one at a time; after each key the caller
+    must consume the value with value() or, for a nested object, items().
+    Only the value being decoded is ever held in memory.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has already been parsed before growing the buffer
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError("Unexpected end of JSON file")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A number cut off by the chunk boundary still decodes, so only trust a
+            # value that is followed by a delimiter (or the end of the file)
+            if end is not None and ((end < len(self.buf) and self.buf[end] in DELIMITERS) or self.eof):
+                self.pos = end
+                return value
+            # Grow geometrically so a huge value isn't re-parsed once per chunk
+            if not self._fill(max(self.chunk_size, len(self.buf) - self.pos)):
+                if end is None:
+                    raise ValueError(f"Invalid JSON value at offset {self.pos}")
+
+    def items(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self.pos += 1
+            else:
+                self._expect("}")
+                return
+
+
+class Progress:
+    """Counts records and bytes for one file and prints the throughput."""
+
+    def __init__(self, label):
+        self.label = label
+        self.records = 0
+        self.started = time.perf_counter()
+
+    def done(self, path):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        print(f"{self.label}: {self.records} records, {size / 1e6:.2f} MB in {elapsed:.2f}s "
+              f"({self.records / elapsed:,.0f} records/s, {size / 1e6 / elapsed:.2f} MB/s)")
+
+
+def _batched_insert(conn, sql, rows, progress):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            with storage.transaction():
+                conn.executemany(sql, batch)
+            progress.records += len(batch)
+            batch = []
+    if batch:
+        with storage.transaction():
+            conn.executemany(sql, batch)
+        progress.records += len(batch)
+
+
+# --- Import: legacy JSON -> database ---
+def _import_points(stream, conn, progress):
+    # Fold pending ledger entries into the snapshot so imported balances replace them
+    storage.compact_ledger()
+    for key in stream.items():
+        if key == "user_points":
+            _batched_insert(
+                conn,
+                "INSERT INTO points (user_id, amount) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET amount = excluded.amount",
+                ((str(uid), stream.value()) for uid in stream.items()),
+                progress)
+        elif key == "bot_bank":
+            with storage.transaction():
+                conn.execute("INSERT OR REPLACE INTO bot_bank (id, amount) VALUES (0, ?)",
+                             (stream.value().get("amount", 0),))
+            progress.records += 1
+        else:
+            stream.value()
+
+
+def _import_inventory(stream, conn, progress, drop_unknown=False):
+    dropped = []
+
+    def rows():
+        for uid in stream.items():
+            seen = len(dropped)
+            try:
+                stacks = compact_units(stream.value(), dropped if drop_unknown else None)
+            except ValueError as e:
+                raise ValueError(f"{e} in {uid}'s inventory; no inventories were imported "
+                                 "(rerun with --drop-unknown to skip such units)") from None
+            for unit in dropped[seen:]:
+                print(f"Dropping unknown unit from {uid}'s inventory: {unit.get('name')} ({unit.get('stars')}⭐)")
+            yield str(uid), json.dumps([stack.to_record() for stack in stacks])
+    # One transaction for the whole file, so an unknown unit rolls back every batch
+    with storage.transaction():
+        _batched_insert(
+            conn,
+            "INSERT INTO inventories (user_id, units) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET units = excluded.units",
+            rows(), progress)
+    return len(dropped)
+
+
+def _import_prestige(stream, conn, progress):
+    _batched_insert(
+        conn,
+        "INSERT INTO prestige (user_id, level) VALUES (?, ?) "
+        "ON CONFLICT(user_id) DO UPDATE SET level = excluded.level",
+        ((str(uid), stream.value()) for uid in stream.items()),
+        progress)
+
+
+def _import_active_units(stream, conn, progress):
+    def rows():
+        for uid in stream.items():
+            active = stream.value()
+            yield str(uid), active["name"], active["stars"]
+    _batched_insert(
+        conn,
+        "INSERT INTO active_units (user_id, name, stars) VALUES (?, ?, ?) "
+        "ON CONFLICT(user_id) DO UPDATE SET name = excluded.name, stars = excluded.stars",
+        rows(), progress)
+
+
+def _import_boss(stream, conn, progress):
+    # The boss is a single small record
+    boss = stream.value()
+    if boss:
+        storage.save_boss_state(boss)
+        progress.records += 1
+
+
+IMPORTERS = {
+    "points": _import_points,
+    "inventory": _import_inventory,
+    "prestige": _import_prestige,
+    "active_units": _import_active_units,
+    "boss": _import_boss,
+}
+
+
+def import_dir(src, drop_unknown=False):
+    """Import every legacy file found in `src`; returns the number of units dropped."""
+    conn = storage.get_connection()
+    dropped = 0
+    for name, importer in IMPORTERS.items():
+        path = os.path.join(src, LEGACY_FILES[name])
+        if not os.path.exists(path):
+            print(f"{name}: {path} not found, skipped")
+            continue
+        progress = Progress(f"import {name}")
+        with open(path, "r") as f:
+            if importer is _import_inventory:
+                dropped += importer(JsonStream(f), conn, progress, drop_unknown)
+            else:
+                importer(JsonStream(f), conn, progress)
+        progress.done(path)
+    return dropped
+
+
+# --- Export: database -> legacy JSON ---
+def _write_object(f, rows, write_value):
+    """Write {key: value, ...} from (key, row) pairs without building the dict."""
+    f.write("{")
+    first = True
+    count = 0
+    for key, row in rows:
+        if not first:
+            f.write(", ")
+        first = False
+        f.write(json.dumps(key) + ": ")
+        write_value(f, row)
+        count += 1
+    f.write("}")
+    return count
+
+
+def _export_points(conn, f, progress):
+    # Export settled balances, not the snapshot minus the ledger tail
+    storage.compact_ledger()
+    f.write('{"user_points": ')
+    progress.records += _write_object(
+        f, ((uid, amount) for uid, amount in conn.execute("SELECT user_id, amount FROM points")),
+        lambda f, amount: f.write(json.dumps(amount)))
+    f.write(', "bot_bank": ')
+    json.dump({"amount": storage.get_bot_bank()}, f)
+    f.write("}")
+    progress.records += 1
+
+
+def _write_units(f, units_json):
+    # Expand each stack back into one full unit dict per copy, as the old file stored them
+    f.write("[")
+    first = True
+    for record in json.loads(units_json):
+        unit = resolve_unit(UnitStack.from_record(record))
+        for key in ("id", "passives", "spell_effects"):
+            unit.pop(key, None)
+        text = json.dumps(unit)
+        for _ in range(record[1]):
+            if not first:
+                f.write(", ")
+            first = False
+            f.write(text)
+    f.write("]")
+
+
+def _export_inventory(conn, f, progress):
+    progress.records += _write_object(
+        f, ((uid, units) for uid, units in conn.execute("SELECT user_id, units FROM inventories")),
+        _write_units)
+
+
+def _export_prestige(conn, f, progress):
+    progress.records += _write_object(
+        f, ((uid, level) for uid, level in conn.execute("SELECT user_id, level FROM prestige")),
+        lambda f, level: f.write(json.dumps(level)))
+
+
+def _export_active_units(conn, f, progress):
+    progress.records += _write_object(
+        f, ((uid, (name, stars)) for uid, name, stars in conn.execute("SELECT user_id, name, stars FROM active_units")),
+        lambda f, row: json.dump({"name": row[0], "stars": row[1]}, f))
+
+
+def _export_boss(conn, f, progress):
+    boss = storage.load_boss_state()
+    json.dump(boss, f)
+    progress.records += 1 if boss else 0
+
+
+EXPORTERS = {
+    "points": _export_points,
+    "inventory": _export_inventory,
+    "prestige": _export_prestige,
+    "active_units": _export_active_units,
+    "boss": _export_boss,
+}
+
+
+def export_dir(dst):
+    os.makedirs(dst, exist_ok=True)
+    conn = storage.get_connection()
+    for name, exporter in EXPORTERS.items():
+        path = os.path.join(dst, LEGACY_FILES[name])
+        progress = Progress(f"export {name}")
+        # Write next to the target and swap in, so a failed export never leaves half a file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            exporter(conn, f, progress)
+        os.replace(tmp_path, path)
+        progress.done(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream game data between legacy JSON files and the database.")
+    parser.add_argument("direction", choices=("import", "export"))
+    parser.add_argument("directory", help="Folder holding (or receiving) the legacy JSON files")
+    parser.add_argument("--db", default=storage.DB_FILE, help="Database file (default: %(default)s)")
+    parser.add_argument("--drop-unknown", action="store_true",
+                        help="On import, skip inventory units missing from the catalog instead of failing")
+    args = parser.parse_args(argv)
+    if args.direction == "export" and os.path.abspath(args.directory) == os.path.abspath(storage.DATA_DIR):
+        # The legacy files in data/ seed new databases; don't overwrite them by accident
+        parser.error("refusing to export over the bot's own data folder")
+    storage.DB_FILE = os.path.abspath(args.db)
+    storage.DATA_DIR = os.path.dirname(storage.DB_FILE)
+    # A new target database must not be seeded from the bot's own legacy files
+    for attr in ("POINTS_FILE", "INVENTORY_FILE", "PRESTIGE_FILE", "ACTIVE_UNITS_FILE", "BOSS_FILE"):
+        setattr(storage, attr, "")
+    started = time.perf_counter()
+    dropped = 0
+    if args.direction == "import":
+        try:
+            dropped = import_dir(args.directory, args.drop_unknown)
+        except ValueError as e:
+            print(f"Import failed: {e}")
+            return 1
+    else:
+        export_dir(args.directory)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+    if dropped:
+        # Still a failure: the import went through, but those units are gone
+        print(f"{dropped} unknown unit(s) dropped from inventories")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
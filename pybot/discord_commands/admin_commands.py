@@ -1,4 +1,5 @@
 import discord
+from .battle_commands import BATTLES
 
 def register_admin_commands(client, GUILD_ID):
     @client.tree.command(name="dm_user", description="Send a direct message to a user", guild=GUILD_ID)
@@ -12,3 +13,15 @@ def register_admin_commands(client, GUILD_ID):
         except Exception as e:
             await interaction.response.send_message(f"❌ Error sending message: {str(e)}", ephemeral=True)
             print(f"❌ DM failed with error: {str(e)}")
+
+    @client.tree.command(name="battle_sessions", description="Show how many battles are being tracked", guild=GUILD_ID)
+    async def battle_sessions(interaction: discord.Interaction):
+        # Drop idle battles first so the numbers reflect live ones
+        BATTLES.sweep()
+        counts = BATTLES.counts()
+        await interaction.response.send_message(
+            f"⚔️ Active battles: {counts['active']}/{BATTLES.max_sessions}\n"
+            f"Started: {counts['started']}, finished: {counts['finished']}, "
+            f"expired: {counts['expired']}, refused (full): {counts['rejected']}\n"
+            f"Idle battles are dropped after {BATTLES.ttl}s.",
+            ephemeral=True)
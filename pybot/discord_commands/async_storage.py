@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from . import inventory, storage
+
+# Async facade used by command callbacks. Every blocking database call runs on
+# one dedicated worker thread so the discord.py event loop never waits on disk,
+# and user_lock() serializes read-modify-write sequences on a user's state so
+# two panels clicked at once can't interleave and lose an update.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-io")
+_locks = weakref.WeakValueDictionary()
+
+
+async def run_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def submit_io(func, *args, **kwargs):
+    """Fire-and-forget variant of run_io() for callers that can't await."""
+    return _executor.submit(func, *args, **kwargs)
+
+
+def user_lock(user_id):
+    # Locks live only while someone holds or waits on them
+    key = str(user_id)
+    lock = _locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks[key] = lock
+    return lock
+
+
+# --- Inventory ---
+async def preload_units(user_id):
+    """Make sure the user's inventory is cached before mutating it in memory."""
+    if not inventory.is_loaded(user_id):
+        await run_io(inventory.preload, user_id)
+
+
+async def get_units(user_id):
+    await preload_units(user_id)
+    return inventory.get_units(user_id)
+
+
+async def owned_unit_ids(user_id):
+    await preload_units(user_id)
+    return inventory.owned_unit_ids(user_id)
+
+
+async def summary(user_id):
+    await preload_units(user_id)
+    return inventory.summary(user_id)
+
+
+async def users_with_units():
+    return await run_io(inventory.users_with_units)
+
+
+# --- Active battle units ---
+async def get_active_unit(user_id):
+    return await run_io(storage.get_active_unit, user_id)
+
+
+async def set_active_unit(user_id, name, stars):
+    await run_io(storage.set_active_unit, user_id, name, stars)
+
+
+# --- User settings ---
+async def get_setting(user_id, name, default=None):
+    return await run_io(storage.get_user_setting, user_id, name, default)
+
+
+async def set_setting(user_id, name, value):
+    await run_io(storage.set_user_setting, user_id, name, value)
@@ -1,32 +1,31 @@
 import discord
 import random
-import os
-import json
 import asyncio
 from discord import app_commands
+from discord.ext import tasks
 from discord.ui import View, Button, Select
 
-from .gacha_commands import UNIT_POOL
+from . import async_storage, economy, image_assets, inventory, storage
+from .battle_sessions import SWEEP_INTERVAL, BattleSessions
+from .battle_core import Battle, BattleUnit, resolve
+from .unit_catalog import all_units, find_units, get_unit, resolve_unit
+from .gacha_commands import owned_unit_autocomplete
+from .inventory import STATS
 
-# --- Boss System Integration ---
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-BOSS_FILE = os.path.join(DATA_DIR, "boss_data.json")
+
+KEY_TURNS = 5  # Hardest-hitting turns listed in an auto battle summary
 
 
+# --- Boss System Integration ---
 def load_boss():
-    if os.path.exists(BOSS_FILE):
-        with open(BOSS_FILE, "r") as f:
-            boss = json.load(f)
-            if not boss.get("defeated", False):
-                return boss
-            # If boss is defeated, delete the file to ensure a fresh boss is created
-            try:
-                os.remove(BOSS_FILE)
-            except Exception:
-                pass
+    boss = storage.load_boss_state()
+    if boss:
+        if not boss.get("defeated", False):
+            return boss
+        # If boss is defeated, clear it to ensure a fresh boss is created
+        storage.clear_boss_state()
     # If no boss file or boss is defeated, spawn a new boss
-    boss_unit = random.choice(UNIT_POOL).copy()
-    boss_unit["stats"] = boss_unit["stats"].copy()
+    boss_unit = random.choice(all_units()).to_dict()
     for stat in boss_unit["stats"]:
         boss_unit["stats"][stat] = int(boss_unit["stats"][stat] * 10)
     boss = {
@@ -41,514 +40,140 @@ def load_boss():
         "defeated": False,
         # Preserve spell data for boss
         "spell": boss_unit.get("spell"),
-        "spells": boss_unit.get("spells")
+        "spells": boss_unit.get("spells"),
+        "passives": boss_unit["passives"],
+        "spell_effects": boss_unit["spell_effects"]
     }
-    with open(BOSS_FILE, "w") as f:
-        json.dump(boss, f)
+    storage.save_boss_state(boss)
     return boss
 
 
 def save_boss(boss):
-    with open(BOSS_FILE, "w") as f:
-        json.dump(boss, f)
-
-
-# --- Battle System Core ---
-class BattleUnit:
-    def use_spell(self, battle, spell_idx=0):
-        # Only allow one spell per turn
-        if getattr(self, 'spell_used_this_turn', False):
-            battle.log.append(f"{self.name} already cast a spell this turn!")
-            return 0
-        spells = getattr(self, 'spells', [])
-        if not spells or spell_idx >= len(spells):
-            battle.log.append(f"{self.name} tried to cast a spell, but has none!")
-            return 0
-        spell = spells[spell_idx]
-        spell_name = spell.split(":")[0].strip().lower()
-        # --- Custom meme unit spells ---
-        # Shrek: Swamp Heal (heal 50% HP), Onion Smash (deal 2x ATK-DEF damage)
-        if self.name.lower() == "shrek":
-            if "swamp heal" in spell_name:
-                heal_amount = int(self.max_hp * 0.5)
-                before = self.current_hp
-                self.current_hp = min(self.current_hp + heal_amount, self.max_hp)
-                actual_heal = self.current_hp - before
-                battle.log.append(f"Shrek casts Swamp Heal and restores {actual_heal} HP! ({self.current_hp}/{self.max_hp} HP)")
-                self.spell_used_this_turn = True
-                return actual_heal
-            elif "onion smash" in spell_name:
-                target = battle.units[1] if battle.units[0] == self else battle.units[0]
-                damage = max(0, (self.stats['ATK'] * 2) - target.stats['DEF'])
-                target.current_hp -= damage
-                battle.log.append(f"Shrek uses Onion Smash! Deals {damage} damage to {target.name}. ({target.current_hp}/{target.max_hp} HP left)")
-                self.spell_used_this_turn = True
-                return damage
-        # Amongus: Emergency Meeting (deal 30% max HP to enemy, cannot kill), Vent (50% chance to dodge next attack)
-        elif self.name.lower() == "amongus":
-            if "emergency meeting" in spell_name:
-                heal_amount = int(self.max_hp * 0.4)
-                before = self.current_hp
-                self.current_hp = min(self.current_hp + heal_amount, self.max_hp)
-                actual_heal = self.current_hp - before
-                # Grant +10% DEF for 1 turn
-                self._emergency_def_buff = int(self.stats['DEF'] * 0.1)
-                self.stats['DEF'] += self._emergency_def_buff
-                battle.log.append(f"Amongus calls Emergency Meeting! Heals {actual_heal} HP and gains +10% DEF for 1 turn! ({self.current_hp}/{self.max_hp} HP, DEF {self.stats['DEF']})")
-                self.spell_used_this_turn = True
-                return actual_heal
-            elif "vent" in spell_name:
-                import random
-                self._vent_dodge = random.random() < 0.5
-                if self._vent_dodge:
-                    battle.log.append(f"Amongus uses Vent! They will dodge the next attack!")
-                else:
-                    battle.log.append(f"Amongus uses Vent! But the impostor was caught... no dodge!")
-                self.spell_used_this_turn = True
-                return 1 if self._vent_dodge else 0
-        # Elon Musk: Rocket Launch (deal 40% max HP to enemy), Dogecoin Pump (double ATK for 2 turns)
-        elif self.name.lower() == "elon musk":
-            if "rocket launch" in spell_name:
-                target = battle.units[1] if battle.units[0] == self else battle.units[0]
-                damage = int(target.max_hp * 0.4)
-                target.current_hp -= damage
-                battle.log.append(f"Elon Musk launches a rocket! Deals {damage} damage to {target.name}. ({target.current_hp}/{target.max_hp} HP left)")
-                self.spell_used_this_turn = True
-                return damage
-            elif "dogecoin pump" in spell_name:
-                self._doge_pump_turns = 2
-                battle.log.append(f"Elon Musk pumps Dogecoin! ATK doubled for 2 turns!")
-                self.spell_used_this_turn = True
-                return 1
-        # Heal: Restore 30% HP
-        if "heal" in spell_name:
-            heal_amount = int(self.max_hp * 0.3)
-            before = self.current_hp
-            self.current_hp = min(self.current_hp + heal_amount, self.max_hp)
-            actual_heal = self.current_hp - before
-            battle.log.append(f"{self.name} casts Heal and restores {actual_heal} HP! ({self.current_hp}/{self.max_hp} HP)")
-            self.spell_used_this_turn = True
-            return actual_heal
-        # Fire Breath: Deal ATK - DEF damage to enemy
-        elif "fire breath" in spell_name:
-            # Target is always the other unit
-            target = battle.units[1] if battle.units[0] == self else battle.units[0]
-            damage = max(0, self.stats['ATK'] - target.stats['DEF'])
-            target.current_hp -= damage
-            battle.log.append(f"{self.name} uses Fire Breath! Deals {damage} damage to {target.name}. ({target.current_hp}/{target.max_hp} HP left)")
-            self.spell_used_this_turn = True
-            return damage
-        # Power Surge: Double attack for 1 turn
-        elif "power surge" in spell_name:
-            self._power_surge_active = True
-            battle.log.append(f"{self.name} casts Power Surge! Their next attack will deal double damage!")
-            self.spell_used_this_turn = True
-            return 1
-        # Michael Saves: Stat Boost spell
-        elif "stat boost" in spell_name or (self.name.lower() == "michael saves" and "boost" in spell_name):
-            # Permanently increase all stats by 10
-            for stat in self.stats:
-                self.stats[stat] += 10
-            self.max_hp = self.stats['HP']
-            # If current HP was at max, keep it at new max
-            if self.current_hp == self.max_hp - 10:
-                self.current_hp = self.max_hp
-            battle.log.append(f"{self.name} casts Stat Boost! All stats permanently increased by 10! (Now: ATK {self.stats['ATK']}, DEF {self.stats['DEF']}, HP {self.stats['HP']})")
-            # --- Make stat boost permanent in inventory or boss file ---
-            try:
-                # Only make stat boost permanent for player units (not boss)
-                # Player is always unit1 (index 0) in battle.units
-                if hasattr(battle, 'units') and self is battle.units[0]:
-                    from .gacha_commands import load_inventory, save_inventory
-                    # Find the user id by searching active_units.json
-                    import os, json
-                    ACTIVE_UNITS_FILE = os.path.join(os.path.dirname(__file__), "data/active_units.json")
-                    if os.path.exists(ACTIVE_UNITS_FILE):
-                        with open(ACTIVE_UNITS_FILE, "r") as f:
-                            active_units = json.load(f)
-                        # Find the user whose active unit matches this one
-                        for user_id, active in active_units.items():
-                            if active['name'] == self.name and active['stars'] == self.stars:
-                                inventory = load_inventory()
-                                user_units = inventory.get(user_id, [])
-                                for unit in user_units:
-                                    if unit['name'] == self.name and unit['stars'] == self.stars:
-                                        for stat in self.stats:
-                                            unit['stats'][stat] = self.stats[stat]
-                                        save_inventory(inventory)
-                                        break
-            except Exception as e:
-                battle.log.append(f"(Permanent stat boost failed to save: {e})")
-            self.spell_used_this_turn = True
-            return 1
-        else:
-            battle.log.append(f"{self.name} tried to cast {spell}, but nothing happened.")
-            return 0
-
-    def __init__(self, unit_data):
-        self.name = unit_data['name']
-        self.stars = unit_data['stars']
-        self.stats = unit_data['stats'].copy()
-        self.ability = unit_data['ability']
-        self.max_hp = self.stats['HP']
-        self.current_hp = self.max_hp
-        self.passives = []  # List of passive functions
-        self.image = unit_data.get('image')
-        
-        # Handle spell data properly
-        spell_data = unit_data.get('spell', unit_data.get('spells'))
-        if isinstance(spell_data, str):
-            self.spells = [spell_data]
-        elif isinstance(spell_data, list):
-            self.spells = spell_data
-        else:
-            self.spells = []
-            
-        # Register passives based on ability string
-        self.register_passives()
-
-    def register_passives(self):
-        # Add passive hooks based on ability name or keywords
-        if 'Double Defence' in self.ability or 'Sticky Body' in self.ability:
-            self.passives.append(self.sticky_body)
-        if 'Reduces incoming damage' in self.ability or 'Shield Wall' in self.ability:
-            self.passives.append(self.shield_wall)
-        if 'Sneak Attack' in self.ability:
-            self.passives.append(self.sneak_attack)
-        if 'Arcane Blast' in self.ability:
-            self.passives.append(self.arcane_blast)
-        if 'Inferno' in self.ability:
-            self.passives.append(self.inferno)
-        if 'America supports Michael Saves' in self.ability:
-            self.passives.append(self.america_supports)
-        # Shrek passive: Get Out Of My Swamp (Reduces enemy ATK by 20%)
-        if 'Get Out Of My Swamp' in self.ability:
-            self.passives.append(self.shrek_swamp)
-        # Amongus passive: Sus Attack (chance to instantly defeat enemy)
-        if 'Sus Attack' in self.ability:
-            self.passives.append(self.amongus_sus_attack)
-        # Elon Musk passive: To The Moon (bonus damage on attack)
-        if 'To The Moon' in self.ability:
-            self.passives.append(self.elon_moon)
+    storage.save_boss_state(boss)
 
-    # --- Passive Implementations ---
-    def sticky_body(self, trigger, attacker, damage, battle):
-        if trigger == 'on_defend':
-            reduced = max(0, damage - self.stats['DEF'])
-            battle.log.append(
-                f"{self.name}'s Sticky Body activates! DEF doubled, damage reduced to {reduced}."
-            )
-            return reduced
-        return damage
-    def shrek_swamp(self, trigger, attacker, damage, battle):
-        # Passive: Reduces enemy ATK by 20% when defending
-        if trigger == 'on_defend':
-            reduced_atk = int(attacker.stats['ATK'] * 0.8)
-            new_damage = max(0, reduced_atk - self.stats['DEF'])
-            battle.log.append(f"Shrek's Get Out Of My Swamp! Enemy ATK reduced by 20%. Damage: {new_damage}")
-            return new_damage
-        return damage
-
-    def amongus_sus_attack(self, trigger, attacker, damage, battle):
-        # Passive: Chance to instantly defeat enemy on every attack
-        if trigger == 'on_attack':
-            import random
-            if random.random() < 0.1:  # 10% chance
-                battle.log.append(f"Amongus used Sus Attack! The enemy was instantly defeated!")
-                if hasattr(battle, 'units'):
-                    target = battle.units[1] if battle.units[0] == self else battle.units[0]
-                    target.current_hp = 0
-                return 99999  # Overkill damage
-        return damage
-
-    def elon_moon(self, trigger, attacker, damage, battle):
-        # Passive: To The Moon - bonus damage on attack
-        if trigger == 'on_attack':
-            # 15% more damage, not +15 flat
-            bonus = int(damage * 0.15)
-            total_damage = damage + bonus
-            battle.log.append(f"Elon Musk's To The Moon! Bonus {bonus} damage added (15% more, total {total_damage}).")
-            return total_damage
-        return damage
-
-    def shield_wall(self, trigger, attacker, damage, battle):
-        if trigger == 'on_defend':
-            reduced = max(0, damage - 10)
-            battle.log.append(
-                f"{self.name}'s Shield Wall activates! Damage reduced by 10 to {reduced}."
-            )
-            return reduced
-        return damage
-
-    def sneak_attack(self, trigger, attacker, damage, battle):
-        # Deals double damage on first hit
-        if trigger == 'on_attack':
-            if not hasattr(self, '_sneak_attack_used'):
-                self._sneak_attack_used = True
-                doubled = damage * 2
-                battle.log.append(
-                    f"{self.name}'s Sneak Attack! First hit deals double damage: {doubled}."
-                )
-                return doubled
-        return damage
-
-    def arcane_blast(self, trigger, attacker, damage, battle):
-        # Ignores 50% of enemy DEF
-        if trigger == 'on_attack':
-            if hasattr(attacker, 'stats') and hasattr(battle, 'units'):
-                defender = battle.units[1 - battle.turn]
-                orig_def = defender.stats['DEF']
-                reduced_def = orig_def * 0.5
-                base_damage = max(0, attacker.stats['ATK'] - reduced_def)
-                battle.log.append(
-                    f"{self.name}'s Arcane Blast! Ignores 50% DEF, damage is {base_damage}."
-                )
-                return base_damage
-        return damage
-
-    def inferno(self, trigger, attacker, damage, battle):
-        # Deals 30 splash damage to all enemies at the end of the turn
-        if trigger == 'on_turn_end':
-            # Only apply if this unit is the attacker
-            if hasattr(self, 'name') and 'Dragon' in self.name:
-                for unit in battle.units:
-                    if unit is not self:
-                        unit.current_hp -= 30
-                        battle.log.append(
-                            f"{self.name}'s Inferno triggers! Deals 30 splash damage to {unit.name}."
-                        )
-        return damage
-
-    def america_supports(self, trigger, attacker, damage, battle):
-        # Double post-mitigation damage
-        if trigger == 'on_attack':
-            boosted = int(damage * 2)
-            battle.log.append(
-                f"{self.name}'s America supports Michael Saves! Post-mitigation damage DOUBLED: {damage} → {boosted}."
-            )
-            return boosted
-        return damage
 
-    def on_attack(self, target, battle):
-        # Called when this unit attacks
-        damage = max(0, self.stats['ATK'] - target.stats['DEF'])
-        # --- Custom meme unit passives/abilities ---
-        # Amongus Vent: dodge should trigger on defense, not attack
-        # Elon Musk Dogecoin Pump: double ATK for 2 turns
-        if hasattr(self, '_doge_pump_turns') and self._doge_pump_turns > 0:
-            damage *= 2
-            self._doge_pump_turns -= 1
-            battle.log.append(f"Elon Musk's Dogecoin Pump doubles his attack!")
-        # Power Surge: double damage for one turn if active
-        if hasattr(self, '_power_surge_active') and self._power_surge_active:
-            damage *= 2
-            battle.log.append(f"{self.name}'s Power Surge doubles their attack damage!")
-            self._power_surge_active = False
-        # Elon Musk bonus: if ability contains 'To The Moon', add 100% of ATK as bonus damage
-        if self.name.lower() == "elon musk" and "To The Moon" in self.ability:
-            bonus = self.stats['ATK']
-            damage += bonus
-            battle.log.append(f"Elon Musk's To The Moon! Deals extra {bonus} damage (100% of ATK). Total: {damage}")
-        # Apply passives that modify outgoing damage
-        for passive in self.passives:
-            damage = passive('on_attack', self, damage, battle)
-        return damage
+def save_boss_hp(current_hp):
+    # Read-modify-write of the boss row; run through async_storage so it stays serialized.
+    # Reads the row directly: load_boss() would spawn a new boss if this one was
+    # already killed, and a late write must not land on the next boss.
+    boss = storage.load_boss_state()
+    if not boss or boss.get("defeated", False):
+        return
+    boss["current_hp"] = current_hp
+    save_boss(boss)
 
-    def on_defend(self, attacker, damage, battle):
-        # Called when this unit is attacked
-        # Amongus Vent: dodge next attack
-        if hasattr(self, '_vent_dodge') and self._vent_dodge:
-            battle.log.append(f"Amongus dodges the attack thanks to Vent!")
-            self._vent_dodge = False
-            return 0
-        for passive in self.passives:
-            damage = passive('on_defend', attacker, damage, battle)
-        return damage
 
-    def on_turn_start(self, battle):
-        # Called at the start of this unit's turn
-        self.spell_used_this_turn = False
-
-    def on_turn_end(self, battle):
-        # Called at the end of this unit's turn
-        # Remove temporary DEF buff from Emergency Meeting
-        if hasattr(self, '_emergency_def_buff'):
-            self.stats['DEF'] -= self._emergency_def_buff
-            del self._emergency_def_buff
-            if hasattr(battle, 'log'):
-                battle.log.append(f"Amongus' Emergency Meeting DEF buff expired. DEF back to {self.stats['DEF']}")
-
-
-class Battle:
-
-    def __init__(self, unit1, unit2):
-        self.units = [unit1, unit2]
-        self.turn = 0  # 0 or 1
-        self.log = []
-        # Second player shield: scales with ATK, DEF, HP
-        atk = unit2.stats.get('ATK', 0)
-        defense = unit2.stats.get('DEF', 0)
-        hp = unit2.stats.get('HP', 0)
-        shield_val = int(0.2 * (atk + defense) + 0.1 * hp)
-        self.second_player_shield = shield_val
-        self.second_player_shield_used = False
-        self.log.append(
-            f"Second Player Shield: {unit2.name} receives a shield that absorbs the first {shield_val} damage!"
-        )
-
-    def next_turn(self):
-        attacker = self.units[self.turn]
-        defender = self.units[1 - self.turn]
-        # Start of turn passives
-        attacker.on_turn_start(self)
-        defender.on_turn_start(self)
-        # Attack phase
-        damage = attacker.on_attack(defender, self)
-        # Second player shield logic: only applies to unit2 (index 1), only on first hit
-        shield_broken = False
-        shield_absorbed = 0
-        if (self.turn == 0 and not self.second_player_shield_used
-                and self.second_player_shield > 0):
-            absorbed = min(damage, self.second_player_shield)
-            damage -= absorbed
-            self.second_player_shield -= absorbed
-            shield_absorbed = absorbed
-            self.second_player_shield_used = True
-            if absorbed > 0:
-                self.log.append(
-                    f"Second Player Shield absorbs {absorbed} damage from the first attack!"
-                )
-            if self.second_player_shield <= 0:
-                shield_broken = True
-                self.log.append(f"Second Player Shield is broken!")
-        # Passives on defend
-        damage = defender.on_defend(attacker, damage, self)
-        defender.current_hp -= damage
-        # Recap: show shield absorption if any
-        if shield_absorbed > 0:
-            self.log.append(
-                f"{attacker.name} attacks {defender.name} for {damage} damage! (🛡️ {shield_absorbed} absorbed, {defender.current_hp}/{defender.max_hp} HP left)"
-            )
-        else:
-            self.log.append(
-                f"{attacker.name} attacks {defender.name} for {damage} damage! ({defender.current_hp}/{defender.max_hp} HP left)"
-            )
-        # End of turn passives
-        attacker.on_turn_end(self)
-        defender.on_turn_end(self)
-        # Special: Dragon's Inferno triggers at end of turn
-        if hasattr(attacker, 'passives'):
-            for passive in attacker.passives:
-                passive('on_turn_end', attacker, 0, self)
-        self.turn = 1 - self.turn
-        return self.check_winner()
-
-    def check_winner(self):
-        if self.units[0].current_hp <= 0:
-            return 1  # unit2 wins
-        if self.units[1].current_hp <= 0:
-            return 0  # unit1 wins
+def claim_boss_jackpot(user_id):
+    """Mark the boss defeated, pay the winner and spawn the next boss. Returns the prize, or None if already claimed."""
+    boss = storage.load_boss_state()
+    if not boss or boss.get("defeated", False):
         return None
-
-
-ACTIVE_UNITS_FILE = os.path.join(os.path.dirname(__file__),
-                                 "data/active_units.json")
-INVENTORY_FILE = os.path.join(os.path.dirname(__file__),
-                              "data/gacha_inventory.json")
-
-
-def load_active_units():
-    if os.path.exists(ACTIVE_UNITS_FILE):
-        with open(ACTIVE_UNITS_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-
-def save_active_units(active_units):
-    with open(ACTIVE_UNITS_FILE, "w") as f:
-        json.dump(active_units, f)
-
-
-def load_inventory():
-    if os.path.exists(INVENTORY_FILE):
-        with open(INVENTORY_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
+    boss["defeated"] = True
+    total_stats = sum(boss["stats"].values())
+    JACKPOT_MULTIPLIER = 10  # Change this value to adjust the multiplier
+    jackpot = int(total_stats * JACKPOT_MULTIPLIER)
+    from .prestige_commands import get_point_multiplier
+    jackpot = int(jackpot * get_point_multiplier(str(user_id)))
+    economy.add_points(user_id, jackpot, "boss_jackpot")
+    boss["current_hp"] = 0
+    save_boss(boss)
+    # Spawn a new boss
+    load_boss()
+    return jackpot
+
+
+def persist_stat_boost(user_id, name, stars, stats):
+    """Store a boosted unit's stats as deltas on its owner's inventory entry.
+
+    Only `user_id`'s inventory is touched: the first stack of the unit, which
+    is the copy get_user_unit() sent into the battle.
+    """
+    try:
+        for stack in inventory.get_units(user_id):
+            template = get_unit(stack.unit_id)
+            if template.name == name and template.stars == stars:
+                # Store the boosted stats as deltas against the catalog unit
+                delta = [stats[stat] - base for stat, base in zip(STATS, template.stats)]
+                inventory.set_delta(user_id, stack.unit_id, stack.delta, delta)
+                break
+    except Exception as e:
+        print(f"[stat boost] Permanent stat boost failed to save: {e}")
+
+
+def save_stat_boost(user_id, unit):
+    # Saved on the storage thread so the spell never waits on disk
+    async_storage.submit_io(persist_stat_boost, user_id, unit.name, unit.stars, dict(unit.stats))
 
 
 async def get_user_unit(user_id):
-    active_units = load_active_units()
-    inventory = load_inventory()
-    user_units = inventory.get(str(user_id), [])
-    if not user_units:
+    stacks = await async_storage.get_units(user_id)
+    if not stacks:
         return None
-    active = active_units.get(str(user_id))
+    active = await async_storage.get_active_unit(user_id)
     if active:
         # Find the first unit in inventory matching the name and stars
-        for unit in user_units:
-            if unit['name'] == active['name'] and unit['stars'] == active[
-                    'stars']:
-                return unit
+        active_ids = {u.id for u in find_units(active['name'], active['stars'])}
+        for stack in stacks:
+            if get_unit(stack.unit_id).id in active_ids:
+                return resolve_unit(stack)
     # Default: return first unit
-    return user_units[0]
+    return resolve_unit(stacks[0])
 
 
 async def get_bot_unit():
-    return random.choice(UNIT_POOL)
+    return random.choice(all_units()).to_dict()
+
 
+# Ongoing battles: {(channel_id, user_id): Battle}, with idle ones swept out
+BATTLES = BattleSessions()
 
-# Global dict to store ongoing battles: {(channel_id, user_id): Battle}
-BATTLES = {}
+
+@tasks.loop(seconds=SWEEP_INTERVAL)
+async def sweep_idle_battles():
+    # Runs on the event loop like every other BATTLES access, so no locking is needed
+    BATTLES.sweep()
 
 
 class BattleView(View):
-    async def update_battle_embed(self, interaction):
+    def battle_embed(self, show_turn=True, title="Battle Turn"):
+        """(embed, files) showing the battle's current state; every battle message is built here."""
         battle = self.battle
-        log = '\n'.join(battle.log[-1:])
-        embed = discord.Embed(title="Battle Turn", description=log)
+        log = '\n'.join(battle.recent())
+        embed = discord.Embed(title=title, description=log)
         unit1 = battle.units[0]
         unit2 = battle.units[1]
-        file1, url1 = self.get_unit_image_file(unit1)
-        file2, url2 = self.get_unit_image_file(unit2)
-        if url1:
-            embed.set_thumbnail(url=url1)
-        if url2:
-            embed.set_image(url=url2)
+        files = self.add_unit_images(embed)
         hp_bar1 = self.get_hp_bar(unit1.current_hp, unit1.max_hp)
         hp_bar2 = self.get_hp_bar(unit2.current_hp, unit2.max_hp)
         label1 = f"Your Unit: {unit1.name} HP"
-        label2 = f"Opponent Unit: {unit2.name} HP" if not self.is_bot else f"Bot Unit: {unit2.name} HP"
-        stats1 = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.stats['DEF']}"
-        stats2 = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.stats['DEF']}"
+        label2 = f"Opponent Unit: {unit2.name} HP" if not self.is_bot else f"Boss Unit: {unit2.name} HP"
+        stats1 = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.defense}"
+        stats2 = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.defense}"
         shield_val = getattr(battle, 'second_player_shield', 0)
         shield_used = getattr(battle, 'second_player_shield_used', False)
+        # Only show shield on the first turn (before it is used)
         if not shield_used and shield_val > 0:
             shield_str = f"\n🛡️ Shield: {shield_val}"
         else:
             shield_str = ""
         embed.add_field(name=label1, value=f"{unit1.current_hp}/{unit1.max_hp}\n{hp_bar1}\n{stats1}")
         embed.add_field(name=label2, value=f"{unit2.current_hp}/{unit2.max_hp}\n{hp_bar2}\n{stats2}{shield_str}")
-        files = []
-        if file1:
-            files.append(file1)
-        if file2 and (not file1 or file2.filename != file1.filename):
-            files.append(file2)
         # Show whose turn it is
-        if self.is_bot:
-            if battle.turn == 0:
-                embed.description += f"\nYour turn!"
+        if show_turn:
+            if self.is_bot:
+                if battle.turn == 0:
+                    embed.description += f"\nYour turn!"
+                else:
+                    embed.description += f"\nBot is thinking..."
             else:
-                embed.description += f"\nBot is thinking..."
-        else:
-            turn_user = self.user_id if battle.turn == 0 else self.opponent_id
-            embed.description += f"\n<@{turn_user}>'s turn!"
+                turn_user = self.user_id if battle.turn == 0 else self.opponent_id
+                embed.description += f"\n<@{turn_user}>'s turn!"
+        return embed, files
+
+    async def update_battle_embed(self, interaction):
+        embed, files = self.battle_embed()
         await interaction.response.edit_message(embed=embed, attachments=files, view=self)
+
     def get_hp_bar(self, current, maximum, length=16):
         # Unicode block bar: ▰ = filled, ▱ = empty
         if maximum <= 0:
@@ -557,14 +182,78 @@ class BattleView(View):
         empty = length - filled
         return '▰' * filled + '▱' * empty
 
-    def get_unit_image_file(self, unit):
-        # Try to resolve image path for the unit
+    async def check_session(self, interaction):
+        # A swept or replaced battle can't be played on from an old message
+        if BATTLES.touch((interaction.channel_id, str(self.user_id)), self.battle):
+            return True
+        await interaction.response.send_message("This battle has expired. Start a new one with /fight!", ephemeral=True)
+        return False
+
+    async def on_timeout(self):
+        BATTLES.sweep()
+
+    def get_unit_image_file(self, unit, variant="card"):
+        # Cached CDN URL when the image was uploaded already, else the file to attach
         if hasattr(unit, 'image') and unit.image:
-            image_path = os.path.join(os.path.dirname(__file__), unit.image)
-            if os.path.exists(image_path):
-                return discord.File(image_path, filename=os.path.basename(image_path)), f"attachment://{os.path.basename(image_path)}"
+            return image_assets.embed_image(unit.image, variant)
         return None, None
 
+    def add_unit_images(self, embed):
+        """Put both units' pictures on `embed` and return the files to attach with it."""
+        file1, url1 = self.get_unit_image_file(self.battle.units[0], "thumb")
+        file2, url2 = self.get_unit_image_file(self.battle.units[1])
+        if url1:
+            embed.set_thumbnail(url=url1)
+        if url2:
+            embed.set_image(url=url2)
+        files = []
+        if file1:
+            files.append(file1)
+        # A mirror match uses one picture twice; attach it once
+        if file2 and (not file1 or file2.filename != file1.filename):
+            files.append(file2)
+        return files
+
+    async def auto_resolve(self, channel_id):
+        """Finish a boss fight in one pass, save the result once and build one summary embed.
+
+        Both sides only attack: no spells are cast, and a fight still going
+        after MAX_TURNS ends without a winner.
+        """
+        battle = self.battle
+        unit1 = battle.units[0]
+        unit2 = battle.units[1]
+        winner, turns = resolve(battle)
+        BATTLES.end((channel_id, str(self.user_id)), battle)
+        # One write for the whole fight: the jackpot claim also zeroes the boss HP
+        jackpot = None
+        if winner == 0:
+            jackpot = await async_storage.run_io(claim_boss_jackpot, self.user_id)
+        else:
+            await async_storage.run_io(save_boss_hp, unit2.current_hp)
+        key = sorted(sorted(turns, key=lambda t: -t[3])[:KEY_TURNS] + turns[-1:])
+        lines = []
+        for turn, attacker, defender, damage, hp_left in key:
+            line = f"Turn {turn}: {attacker} → {defender}: {damage} damage ({max(0, hp_left)} HP left)"
+            if not lines or lines[-1] != line:
+                lines.append(line)
+        embed = discord.Embed(title="Auto Battle", description="\n".join(lines))
+        files = self.add_unit_images(embed)
+        embed.add_field(name=f"Your Unit: {unit1.name} HP",
+                        value=f"{max(0, unit1.current_hp)}/{unit1.max_hp}\n{self.get_hp_bar(unit1.current_hp, unit1.max_hp)}")
+        embed.add_field(name=f"Boss Unit: {unit2.name} HP",
+                        value=f"{max(0, unit2.current_hp)}/{unit2.max_hp}\n{self.get_hp_bar(unit2.current_hp, unit2.max_hp)}")
+        if winner is None:
+            # resolve() only stops without a winner at its turn limit
+            result = f"⏱️ Turn limit reached ({len(turns)} turns). No winner; the boss keeps the damage you dealt."
+        else:
+            result = f"{unit1.name} (You) wins!" if winner == 0 else f"{unit2.name} (Bot) wins!"
+        if jackpot is not None:
+            result += f"\n🎉 You defeated the boss and won the jackpot: {jackpot} points! A new boss has appeared!"
+        embed.add_field(name="Result", value=result, inline=False)
+        embed.set_footer(text=f"{len(turns)} turns resolved · Auto battle only attacks, no spells are cast")
+        return embed, files
+
     def __init__(self,
                  battle,
                  user_id,
@@ -580,6 +269,8 @@ class BattleView(View):
         # Always add AttackButton if show_buttons is True (for the current player)
         if show_buttons:
             self.add_item(AttackButton(self))
+            if self.is_bot:
+                self.add_item(AutoBattleButton(self))
         
         # Only add SpellButton if not a boss turn (i.e., not is_bot and it's the boss's turn)
         current_unit = self.battle.units[self.battle.turn]
@@ -607,8 +298,10 @@ class SpellButton(Button):
         if str(interaction.user.id) != str(current_turn_user):
             await interaction.response.send_message("It's not your turn!", ephemeral=True)
             return
+        if not await self.battle_view.check_session(interaction):
+            return
         unit = battle.units[battle.turn]
-        if getattr(unit, 'spell_used_this_turn', False):
+        if unit.spell_used_this_turn:
             await interaction.response.send_message("You already cast a spell this turn!", ephemeral=True)
             return
         if len(self.spells) == 1:
@@ -650,9 +343,29 @@ class SpellSelect(Select):
 
     async def callback(self, interaction):
         idx = int(self.values[0])
+        if not await self.parent_view.battle_view.check_session(interaction):
+            return
         await self.parent_view.spell_button.cast_spell(interaction, idx)
 
 
+class AutoBattleButton(Button):
+
+    def __init__(self, battle_view):
+        super().__init__(label="Auto Battle (attacks only)",
+                         style=discord.ButtonStyle.secondary,
+                         emoji="⏩")
+        self.battle_view = battle_view
+
+    async def callback(self, interaction):
+        if str(interaction.user.id) != str(self.battle_view.user_id):
+            await interaction.response.send_message("It's not your battle!", ephemeral=True)
+            return
+        if not await self.battle_view.check_session(interaction):
+            return
+        embed, files = await self.battle_view.auto_resolve(interaction.channel_id)
+        await interaction.response.edit_message(embed=embed, attachments=files, view=None)
+
+
 class AttackButton(Button):
 
     def __init__(self, battle_view):
@@ -668,64 +381,17 @@ class AttackButton(Button):
         if str(interaction.user.id) != str(current_turn_user):
             await interaction.response.send_message("It's not your turn!", ephemeral=True)
             return
+        if not await self.battle_view.check_session(interaction):
+            return
         battle = self.battle_view.battle
         winner = battle.next_turn()
-        log = '\n'.join(battle.log[-1:])
-        embed = discord.Embed(title="Battle Turn", description=log)
+        embed, files = self.battle_view.battle_embed(show_turn=winner is None)
         unit1 = battle.units[0]
         unit2 = battle.units[1]
-        file1, url1 = self.battle_view.get_unit_image_file(unit1)
-        file2, url2 = self.battle_view.get_unit_image_file(unit2)
-        if url1:
-            embed.set_thumbnail(url=url1)
-        if url2:
-            embed.set_image(url=url2)
-        hp_bar1 = self.battle_view.get_hp_bar(unit1.current_hp, unit1.max_hp)
-        hp_bar2 = self.battle_view.get_hp_bar(unit2.current_hp, unit2.max_hp)
-        label1 = f"Your Unit: {unit1.name} HP"
-        if self.battle_view.is_bot:
-            label2 = f"Bot Unit: {unit2.name} HP"
-        else:
-            label2 = f"Opponent Unit: {unit2.name} HP"
-        # Add stats to the HP fields
-        stats1 = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.stats['DEF']}"
-        stats2 = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.stats['DEF']}"
-        shield_val = getattr(battle, 'second_player_shield', 0)
-        shield_used = getattr(battle, 'second_player_shield_used', False)
-        # Only show shield on the first turn (before it is used)
-        if not shield_used and shield_val > 0:
-            shield_str = f"\n🛡️ Shield: {shield_val}"
-        else:
-            shield_str = ""
-        embed.add_field(
-            name=label1,
-            value=f"{unit1.current_hp}/{unit1.max_hp}\n{hp_bar1}\n{stats1}")
-        embed.add_field(
-            name=label2,
-            value=
-            f"{unit2.current_hp}/{unit2.max_hp}\n{hp_bar2}\n{stats2}{shield_str}"
-        )
-        # Show whose turn it is
-        if self.battle_view.is_bot:
-            if battle.turn == 0:
-                embed.description += f"\nYour turn!"
-            else:
-                embed.description += f"\nBot is thinking..."
-        else:
-            turn_user = self.battle_view.user_id if battle.turn == 0 else self.battle_view.opponent_id
-            embed.description += f"\n<@{turn_user}>'s turn!"
-        files = []
-        if file1:
-            files.append(file1)
-        if file2 and (not file1 or file2.filename != file1.filename):
-            files.append(file2)
 
         # --- Save boss HP after every turn if boss fight ---
         if self.battle_view.is_bot:
-            from .battle_commands import load_boss, save_boss
-            boss = load_boss()
-            boss["current_hp"] = unit2.current_hp
-            save_boss(boss)
+            await async_storage.run_io(save_boss_hp, unit2.current_hp)
 
         # Remove button for the player who shouldn't act
         if winner is not None:
@@ -735,33 +401,15 @@ class AttackButton(Button):
                 await interaction.response.edit_message(embed=embed,
                                                         attachments=files,
                                                         view=None)
-                BATTLES.pop(
-                    (interaction.channel_id, str(self.battle_view.user_id)),
-                    None)
+                BATTLES.end((interaction.channel_id, str(self.battle_view.user_id)), battle)
                 # If boss was defeated, handle defeat, prize, and respawn immediately
                 if winner == 0:  # Player wins
-                    from .battle_commands import load_boss, save_boss
-                    from .gacha_commands import load_points, save_points
-                    from .prestige_commands import get_point_multiplier
-                    boss = load_boss()
-                    if not boss["defeated"]:
-                        boss["defeated"] = True
-                        total_stats = sum(boss["stats"].values())
-                        JACKPOT_MULTIPLIER = 10  # Change this value to adjust the multiplier
-                        jackpot = int(total_stats * JACKPOT_MULTIPLIER)
-                        user_points = load_points()
-                        multiplier = get_point_multiplier(str(self.battle_view.user_id))
-                        prestige_jackpot = int(jackpot * multiplier)
-                        user_points[str(self.battle_view.user_id)] = user_points.get(str(self.battle_view.user_id), 0) + prestige_jackpot
-                        save_points(user_points)
-                        boss["current_hp"] = 0
-                        save_boss(boss)
+                    prestige_jackpot = await async_storage.run_io(claim_boss_jackpot, self.battle_view.user_id)
+                    if prestige_jackpot is not None:
                         # Announce the prize
                         await interaction.followup.send(
                             f"🎉 You defeated the boss and won the jackpot: {prestige_jackpot} points! A new boss has appeared!",
                             ephemeral=False)
-                        # Spawn a new boss
-                        load_boss()
                 return
             else:
                 # Get the winner's Discord display name
@@ -784,9 +432,7 @@ class AttackButton(Button):
                     pass  # Implement message update logic if you store message references
                 except Exception as e:
                     print(f"[PvP UI] Could not update other player's result message: {e}")
-                BATTLES.pop(
-                    (interaction.channel_id, str(self.battle_view.user_id)),
-                    None)
+                BATTLES.end((interaction.channel_id, str(self.battle_view.user_id)), battle)
                 return
 
         # If bot, handle bot turn
@@ -800,53 +446,24 @@ class AttackButton(Button):
                                                                     show_buttons=False))
             await asyncio.sleep(1)
             winner = battle.next_turn()
-            log2 = '\n'.join(battle.log[-1:])
-            embed2 = discord.Embed(title="Battle Turn", description=log2)
-            file1b, url1b = self.battle_view.get_unit_image_file(unit1)
-            file2b, url2b = self.battle_view.get_unit_image_file(unit2)
-            if url1b:
-                embed2.set_thumbnail(url=url1b)
-            if url2b:
-                embed2.set_image(url=url2b)
-            hp_bar1b = self.battle_view.get_hp_bar(unit1.current_hp,
-                                                   unit1.max_hp)
-            hp_bar2b = self.battle_view.get_hp_bar(unit2.current_hp,
-                                                   unit2.max_hp)
-            label1b = f"Your Unit: {unit1.name} HP"
-            label2b = f"Bot Unit: {unit2.name} HP"
-            stats1b = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.stats['DEF']}"
-            stats2b = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.stats['DEF']}"
-            embed2.add_field(
-                name=label1b,
-                value=
-                f"{unit1.current_hp}/{unit1.max_hp}\n{hp_bar1b}\n{stats1b}")
-            embed2.add_field(
-                name=label2b,
-                value=
-                f"{unit2.current_hp}/{unit2.max_hp}\n{hp_bar2b}\n{stats2b}")
+            embed2, files2 = self.battle_view.battle_embed(show_turn=winner is None)
 
             # --- Save boss HP after every bot turn ---
-            from .battle_commands import load_boss, save_boss
-            boss = load_boss()
-            boss["current_hp"] = unit2.current_hp
-            save_boss(boss)
+            await async_storage.run_io(save_boss_hp, unit2.current_hp)
 
             if winner is not None:
                 result = f"{unit1.name} (You) wins!" if winner == 0 else f"{unit2.name} (Bot) wins!"
                 embed2.add_field(name="Result", value=result, inline=False)
                 await interaction.edit_original_response(
                     embed=embed2,
-                    attachments=[f for f in [file1b, file2b] if f],
+                    attachments=files2,
                     view=None)
-                BATTLES.pop(
-                    (interaction.channel_id, str(self.battle_view.user_id)),
-                    None)
+                BATTLES.end((interaction.channel_id, str(self.battle_view.user_id)), battle)
                 return
-            embed2.description += "\nYour turn!"
             # Always reuse the same battle object for the view, so spell button is correct
             await interaction.edit_original_response(
                 embed=embed2,
-                attachments=[f for f in [file1b, file2b] if f],
+                attachments=files2,
                 view=BattleView(self.battle_view.battle,
                                 self.battle_view.user_id,
                                 self.battle_view.opponent_id,
@@ -876,49 +493,6 @@ class AttackButton(Button):
                 except Exception as e:
                     print(f"[PvP UI] Could not update other user's view: {e}")
 
-    async def update_battle_embed(self, interaction):
-        battle = self.battle
-        log = '\n'.join(battle.log[-1:])
-        embed = discord.Embed(title="Battle Turn", description=log)
-        unit1 = battle.units[0]
-        unit2 = battle.units[1]
-        file1, url1 = self.get_unit_image_file(unit1)
-        file2, url2 = self.get_unit_image_file(unit2)
-        if url1:
-            embed.set_thumbnail(url=url1)
-        if url2:
-            embed.set_image(url=url2)
-        hp_bar1 = self.get_hp_bar(unit1.current_hp, unit1.max_hp)
-        hp_bar2 = self.get_hp_bar(unit2.current_hp, unit2.max_hp)
-        label1 = f"Your Unit: {unit1.name} HP"
-        label2 = f"Opponent Unit: {unit2.name} HP"
-        stats1 = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.stats['DEF']}"
-        stats2 = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.stats['DEF']}"
-        shield_val = getattr(battle, 'second_player_shield', 0)
-        shield_used = getattr(battle, 'second_player_shield_used', False)
-        if not shield_used and shield_val > 0:
-            shield_str = f"\n🛡️ Shield: {shield_val}"
-        else:
-            shield_str = ""
-        embed.add_field(name=label1, value=f"{unit1.current_hp}/{unit1.max_hp}\n{hp_bar1}\n{stats1}")
-        embed.add_field(name=label2, value=f"{unit2.current_hp}/{unit2.max_hp}\n{hp_bar2}\n{stats2}{shield_str}")
-        files = []
-        if file1:
-            files.append(file1)
-        if file2 and (not file1 or file2.filename != file1.filename):
-            files.append(file2)
-        await interaction.response.edit_message(embed=embed, attachments=files, view=self)
-
-    def get_unit_image_file(self, unit):
-        # Try to resolve image path for the unit
-        if hasattr(unit, 'image') and unit.image:
-            image_path = os.path.join(os.path.dirname(__file__), unit.image)
-            if os.path.exists(image_path):
-                return discord.File(
-                    image_path, filename=os.path.basename(image_path)
-                ), f"attachment://{os.path.basename(image_path)}"
-        return None, None
-
 
 def register_battle_commands(client, GUILD_ID):
 
@@ -927,25 +501,19 @@ def register_battle_commands(client, GUILD_ID):
                          guild=GUILD_ID)
     @app_commands.describe(
         name="Name of the unit to set active (case-insensitive)")
+    @app_commands.autocomplete(name=owned_unit_autocomplete)
     async def set_active_unit(interaction: discord.Interaction, name: str):
         user_id = str(interaction.user.id)
-        inventory = load_inventory()
-        user_units = inventory.get(user_id, [])
+        owned_ids = {get_unit(stack.unit_id).id for stack in await async_storage.get_units(user_id)}
         # Find by name (case-insensitive)
-        chosen = next(
-            (u for u in user_units if u['name'].lower() == name.lower()), None)
+        chosen = next((u for u in find_units(name) if u.id in owned_ids), None)
         if not chosen:
             await interaction.response.send_message(
                 f"❌ You don't own a unit named '{name}'.", ephemeral=True)
             return
-        active_units = load_active_units()
-        active_units[user_id] = {
-            "name": chosen['name'],
-            "stars": chosen['stars']
-        }
-        save_active_units(active_units)
+        await async_storage.set_active_unit(user_id, chosen.name, chosen.stars)
         await interaction.response.send_message(
-            f"✅ Set your active unit to {chosen['name']} ({chosen['stars']}⭐)",
+            f"✅ Set your active unit to {chosen.name} ({chosen.stars}⭐)",
             ephemeral=True)
 
     @client.tree.command(
@@ -953,15 +521,20 @@ def register_battle_commands(client, GUILD_ID):
         description="Fight another player or the Boss! (Boss fight if 'boss')",
         guild=GUILD_ID)
     @app_commands.describe(
-        opponent="@mention a user or type 'boss' to fight the AI/Boss")
-    async def fight(interaction: discord.Interaction, opponent: str):
+        opponent="@mention a user or type 'boss' to fight the AI/Boss",
+        auto="Boss fights only: play the whole fight at once, attacks only (no spells), and show a summary")
+    async def fight(interaction: discord.Interaction, opponent: str, auto: bool = False):
         user_id = str(interaction.user.id)
+        if auto and opponent.lower() != 'boss':
+            await interaction.response.send_message(
+                "Auto battle is only available against the boss!", ephemeral=True)
+            return
         if opponent.lower() == 'boss':
             opp_id = 'boss'
-            boss = load_boss()
+            boss = await async_storage.run_io(load_boss)
             if boss["defeated"]:
                 # Respawn a new boss automatically
-                boss = load_boss()
+                boss = await async_storage.run_io(load_boss)
             # Use persistent boss as the opponent
             opp_unit_data = boss.copy()
             # Use current HP for the boss
@@ -998,79 +571,20 @@ def register_battle_commands(client, GUILD_ID):
                     asyncio.create_task(play_curse_you_bayle_audio(interaction.client))
                 except Exception as e:
                     print(f"[fight] Error playing Curse_you_Bayle.mp3: {e}")
-        battle = Battle(unit1, unit2)
-        # Store battle state
-        BATTLES[(interaction.channel_id, user_id)] = battle
-        # Prepare the initial battle embed (same as AttackButton logic)
-        embed = discord.Embed(title="Battle Start!",
-                              description='\n'.join(battle.log[-1:]) +
-                              f"\n<@{user_id}>'s turn!")
-        file1, url1 = BattleView(battle, user_id, opp_id,
-                                 is_bot=is_bot).get_unit_image_file(unit1)
-        file2, url2 = BattleView(battle, user_id, opp_id,
-                                 is_bot=is_bot).get_unit_image_file(unit2)
-        if url1:
-            embed.set_thumbnail(url=url1)
-        if url2:
-            embed.set_image(url=url2)
-        hp_bar1 = BattleView(battle, user_id, opp_id,
-                             is_bot=is_bot).get_hp_bar(unit1.current_hp,
-                                                       unit1.max_hp)
-        hp_bar2 = BattleView(battle, user_id, opp_id,
-                             is_bot=is_bot).get_hp_bar(unit2.current_hp,
-                                                       unit2.max_hp)
-        label1 = f"Your Unit: {unit1.name} HP"
-        label2 = f"Boss Unit: {unit2.name} HP" if is_bot else f"Opponent Unit: {unit2.name} HP"
-        stats1 = f"ATK: {unit1.stats['ATK']}  DEF: {unit1.stats['DEF']}"
-        stats2 = f"ATK: {unit2.stats['ATK']}  DEF: {unit2.stats['DEF']}"
-        shield_val = getattr(battle, 'second_player_shield', 0)
-        shield_used = getattr(battle, 'second_player_shield_used', False)
-        if not shield_used and shield_val > 0:
-            shield_str = f"\n🛡️ Shield: {shield_val}"
-        else:
-            shield_str = ""
-        embed.add_field(
-            name=label1,
-            value=f"{unit1.current_hp}/{unit1.max_hp}\n{hp_bar1}\n{stats1}")
-        embed.add_field(
-            name=label2,
-            value=
-            f"{unit2.current_hp}/{unit2.max_hp}\n{hp_bar2}\n{stats2}{shield_str}")
-        files = []
-        if file1:
-            files.append(file1)
-        if file2 and (not file1 or file2.filename != file1.filename):
-            files.append(file2)
-        await interaction.response.send_message(embed=embed,
-                                                files=files,
-                                                view=BattleView(
-                                                    battle,
-                                                    user_id,
-                                                    opp_id,
-                                                    is_bot=is_bot,
-                                                    show_buttons=True),
-                                                ephemeral=False)
-        # After the battle, update boss HP and handle defeat if boss fight
-        if is_bot and opponent.lower() == 'boss':
-            # This logic should be triggered after the battle ends, e.g. in AttackButton or similar
-            # Patch: scale prize on all boss stats, award points, and spawn new boss
-            from .gacha_commands import load_points, save_points
-            boss = load_boss()
-            if unit2.current_hp <= 0 and not boss["defeated"]:
-                boss["defeated"] = True
-                # Prize: 50% of the sum of all boss stats
-                total_stats = sum(boss["stats"].values())
-                JACKPOT_MULTIPLIER = 10  # Change this value to adjust the multiplier
-                jackpot = int(total_stats * JACKPOT_MULTIPLIER)
-                # Award to the winner (user)
-                user_points = load_points()
-                user_points[user_id] = user_points.get(user_id, 0) + jackpot
-                save_points(user_points)
-                boss["current_hp"] = 0
-                save_boss(boss)
-                # Announce the prize
-                await interaction.followup.send(
-                    f"🎉 You defeated the boss and won the jackpot: {jackpot} points! A new boss has appeared!",
-                    ephemeral=False)
-                # Spawn a new boss
-                load_boss()
\ No newline at end of file
+        # A Stat Boost is saved on the player's own copy only
+        battle = Battle(unit1, unit2, on_stat_boost=lambda unit: save_stat_boost(user_id, unit))
+        if not auto and not BATTLES.start((interaction.channel_id, user_id), battle):
+            await interaction.response.send_message(
+                "Too many battles are running right now, try again in a bit!", ephemeral=True)
+            return
+        if not sweep_idle_battles.is_running():
+            # Started with the first fight, once the event loop is running
+            sweep_idle_battles.start()
+        if auto:
+            view = BattleView(battle, user_id, opp_id, is_bot=True, show_buttons=False)
+            embed, files = await view.auto_resolve(interaction.channel_id)
+            await interaction.response.send_message(embed=embed, files=files, ephemeral=False)
+            return
+        view = BattleView(battle, user_id, opp_id, is_bot=is_bot, show_buttons=True)
+        embed, files = view.battle_embed(title="Battle Start!")
+        await interaction.response.send_message(embed=embed, files=files, view=view, ephemeral=False)
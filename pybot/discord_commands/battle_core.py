@@ -0,0 +1,537 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from .unit_catalog import find_units
+
+# Battle rules with no Discord or storage in them: battle_commands drives a
+# Battle from button clicks, battle_sim.py runs thousands of them headless.
+# Units are built from catalog unit dicts (UnitTemplate.to_dict, a resolved
+# inventory stack or the saved boss).
+MAX_TURNS = 200  # Turns after which a headless battle is called a draw
+LOG_SIZE = 64  # Battle events kept per battle; older ones are dropped
+
+# Battle events are stored as (code, args) and only formatted with these
+# templates when something displays them, so unseen events cost no string work
+MESSAGES = {
+    "already_cast": "{} already cast a spell this turn!",
+    "no_spell": "{} tried to cast a spell, but has none!",
+    "spell_fizzled": "{} tried to cast {}, but nothing happened.",
+    "heal": "{} casts Heal and restores {} HP! ({}/{} HP)",
+    "swamp_heal": "Shrek casts Swamp Heal and restores {} HP! ({}/{} HP)",
+    "onion_smash": "Shrek uses Onion Smash! Deals {} damage to {}. ({}/{} HP left)",
+    "emergency_meeting": "Amongus calls Emergency Meeting! Heals {} HP and gains +10% DEF for 1 turn! ({}/{} HP, DEF {})",
+    "vent": "Amongus uses Vent! They will dodge the next attack!",
+    "vent_caught": "Amongus uses Vent! But the impostor was caught... no dodge!",
+    "rocket_launch": "Elon Musk launches a rocket! Deals {} damage to {}. ({}/{} HP left)",
+    "dogecoin_pump": "Elon Musk pumps Dogecoin! ATK doubled for 2 turns!",
+    "fire_breath": "{} uses Fire Breath! Deals {} damage to {}. ({}/{} HP left)",
+    "power_surge": "{} casts Power Surge! Their next attack will deal double damage!",
+    "stat_boost": "{} casts Stat Boost! All stats permanently increased by 10! (Now: ATK {}, DEF {}, HP {})",
+    "sticky_body": "{}'s Sticky Body activates! DEF doubled, damage reduced to {}.",
+    "swamp": "Shrek's Get Out Of My Swamp! Enemy ATK reduced by 20%. Damage: {}",
+    "sus_attack": "Amongus used Sus Attack! The enemy was instantly defeated!",
+    "moon_atk": "Elon Musk's To The Moon! Deals extra {} damage (100% of ATK). Total: {}",
+    "moon_bonus": "Elon Musk's To The Moon! Bonus {} damage added (15% more, total {}).",
+    "shield_wall": "{}'s Shield Wall activates! Damage reduced by 10 to {}.",
+    "sneak_attack": "{}'s Sneak Attack! First hit deals double damage: {}.",
+    "arcane_blast": "{}'s Arcane Blast! Ignores 50% DEF, damage is {}.",
+    "inferno": "{}'s Inferno triggers! Deals 30 splash damage to {}.",
+    "america_supports": "{}'s America supports Michael Saves! Post-mitigation damage DOUBLED: {} → {}.",
+    "doge_attack": "Elon Musk's Dogecoin Pump doubles his attack!",
+    "surge_attack": "{}'s Power Surge doubles their attack damage!",
+    "vent_dodge": "Amongus dodges the attack thanks to Vent!",
+    "meeting_expired": "Amongus' Emergency Meeting DEF buff expired. DEF back to {1}",
+    "shield": "Second Player Shield: {} receives a shield that absorbs the first {} damage!",
+    "shield_absorbs": "Second Player Shield absorbs {} damage from the first attack!",
+    "shield_broken": "Second Player Shield is broken!",
+    "attack_shielded": "{} attacks {} for {} damage! (🛡️ {} absorbed, {}/{} HP left)",
+    "attack": "{} attacks {} for {} damage! ({}/{} HP left)",
+}
+
+
+def format_event(event):
+    code, args = event
+    return MESSAGES[code].format(*args)
+
+
+# Passive effect id -> (trigger, method) hooks it adds; ids come from the
+# "passives" list of each catalog unit
+PASSIVE_EFFECTS = {
+    "sticky_body": [("on_defend", "sticky_body")],
+    "shield_wall": [("on_defend", "shield_wall")],
+    "sneak_attack": [("on_attack", "sneak_attack")],
+    "arcane_blast": [("on_attack", "arcane_blast")],
+    "inferno": [("on_turn_end", "inferno")],
+    "america_supports": [("on_attack", "america_supports")],
+    "get_out_of_my_swamp": [("on_defend", "shrek_swamp")],
+    "sus_attack": [("on_attack", "amongus_sus_attack")],
+    "to_the_moon": [("on_attack", "elon_moon")],
+}
+TRIGGERS = ("on_attack", "on_defend", "on_turn_end")
+
+# Spell effect id -> method casting it; ids come from "spell_effects"
+SPELL_EFFECTS = {
+    "heal": "cast_heal",
+    "swamp_heal": "cast_swamp_heal",
+    "onion_smash": "cast_onion_smash",
+    "emergency_meeting": "cast_emergency_meeting",
+    "vent": "cast_vent",
+    "rocket_launch": "cast_rocket_launch",
+    "dogecoin_pump": "cast_dogecoin_pump",
+    "fire_breath": "cast_fire_breath",
+    "power_surge": "cast_power_surge",
+    "stat_boost": "cast_stat_boost",
+}
+
+
+# Temporary effects a spell (or passive) puts on a unit. A StatusKind says what
+# the effect does; the unit holds StatusEffect instances with what is left of
+# them. Charges are used up when the effect acts, turns count down at every
+# turn end; an effect is removed when either runs out (None = no limit).
+@dataclass(frozen=True, slots=True)
+class StatusKind:
+    id: str
+    order: int  # Effects act in this order, e.g. Dogecoin Pump before Power Surge
+    stacking: str = "refresh"  # "refresh": re-applying replaces it, "stack": instances add up
+    attack_multiplier: int = 1  # Multiplies outgoing attack damage
+    dodge: bool = False  # Negates the next incoming attack, passives included
+    event: str = None  # MESSAGES code logged when the effect acts, with the unit's name
+    expire_event: str = None  # Logged when its turns run out, with name and DEF
+
+
+DOGECOIN_PUMP = StatusKind("dogecoin_pump", 0, attack_multiplier=2, event="doge_attack")
+POWER_SURGE = StatusKind("power_surge", 1, attack_multiplier=2, event="surge_attack")
+VENT_DODGE = StatusKind("vent_dodge", 2, dodge=True, event="vent_dodge")
+DEF_UP = StatusKind("def_up", 3, expire_event="meeting_expired")
+FIRST_STRIKE = StatusKind("first_strike", 4)  # Consumed by the Sneak Attack passive
+
+# Passive effect id -> status the unit starts the battle with
+STARTING_STATUSES = {
+    "sneak_attack": lambda: StatusEffect(FIRST_STRIKE, charges=1),
+}
+
+
+class StatusEffect:
+
+    __slots__ = ("kind", "charges", "turns", "defense")
+
+    def __init__(self, kind, charges=None, turns=None, defense=0):
+        self.kind = kind
+        self.charges = charges
+        self.turns = turns
+        self.defense = defense  # Added to the unit's DEF while active
+
+
+# --- Battle System Core ---
+class BattleUnit:
+
+    __slots__ = ("name", "stars", "stats", "ability", "max_hp", "current_hp", "image", "spells",
+                 "hooks", "spell_casts", "effects", "def_bonus", "spell_used_this_turn")
+
+    def use_spell(self, battle, spell_idx=0):
+        # Only allow one spell per turn
+        if self.spell_used_this_turn:
+            battle.event("already_cast", self.name)
+            return 0
+        spells = self.spells
+        if not spells or spell_idx >= len(spells):
+            battle.event("no_spell", self.name)
+            return 0
+        cast = self.spell_casts[spell_idx]
+        if cast is None:
+            battle.event("spell_fizzled", self.name, spells[spell_idx])
+            return 0
+        result = cast(battle)
+        self.spell_used_this_turn = True
+        return result
+
+    def other_unit(self, battle):
+        return battle.units[1] if battle.units[0] == self else battle.units[0]
+
+    @property
+    def defense(self):
+        # DEF including temporary buffs; stats['DEF'] stays the unit's own DEF
+        return self.stats['DEF'] + self.def_bonus
+
+    # --- Status effects ---
+    def add_status(self, effect):
+        if effect.kind.stacking == "refresh":
+            self.remove_status(effect.kind)
+        self.effects.append(effect)
+        self.effects.sort(key=lambda e: e.kind.order)
+        self.def_bonus += effect.defense
+
+    def remove_status(self, kind):
+        for effect in [e for e in self.effects if e.kind is kind]:
+            self._drop_status(effect)
+
+    def consume_status(self, kind):
+        """Use one charge of `kind`; False if the unit doesn't have it."""
+        for effect in self.effects:
+            if effect.kind is kind:
+                self._use_charge(effect)
+                return True
+        return False
+
+    def _use_charge(self, effect):
+        if effect.charges is not None:
+            effect.charges -= 1
+            if effect.charges <= 0:
+                self._drop_status(effect)
+
+    def _drop_status(self, effect):
+        self.effects.remove(effect)
+        self.def_bonus -= effect.defense
+
+    # --- Spell Implementations ---
+    def restore_hp(self, fraction):
+        heal_amount = int(self.max_hp * fraction)
+        before = self.current_hp
+        self.current_hp = min(self.current_hp + heal_amount, self.max_hp)
+        return self.current_hp - before
+
+    def cast_heal(self, battle):
+        # Heal: Restore 30% HP
+        actual_heal = self.restore_hp(0.3)
+        battle.event("heal", self.name, actual_heal, self.current_hp, self.max_hp)
+        return actual_heal
+
+    def cast_swamp_heal(self, battle):
+        # Shrek: Swamp Heal (heal 50% HP)
+        actual_heal = self.restore_hp(0.5)
+        battle.event("swamp_heal", actual_heal, self.current_hp, self.max_hp)
+        return actual_heal
+
+    def cast_onion_smash(self, battle):
+        # Shrek: Onion Smash (deal 2x ATK-DEF damage)
+        target = self.other_unit(battle)
+        damage = max(0, (self.stats['ATK'] * 2) - target.defense)
+        target.current_hp -= damage
+        battle.event("onion_smash", damage, target.name, target.current_hp, target.max_hp)
+        return damage
+
+    def cast_emergency_meeting(self, battle):
+        # Amongus: Emergency Meeting (heal 40% HP and +10% DEF for 1 turn)
+        actual_heal = self.restore_hp(0.4)
+        # Grant +10% DEF until the end of the next turn
+        self.add_status(StatusEffect(DEF_UP, turns=1, defense=int(self.defense * 0.1)))
+        battle.event("emergency_meeting", actual_heal, self.current_hp, self.max_hp, self.defense)
+        return actual_heal
+
+    def cast_vent(self, battle):
+        # Amongus: Vent (50% chance to dodge next attack)
+        if random.random() < 0.5:
+            self.add_status(StatusEffect(VENT_DODGE, charges=1))
+            battle.event("vent")
+            return 1
+        # A failed Vent also loses a dodge left over from an earlier one
+        self.remove_status(VENT_DODGE)
+        battle.event("vent_caught")
+        return 0
+
+    def cast_rocket_launch(self, battle):
+        # Elon Musk: Rocket Launch (deal 40% max HP to enemy)
+        target = self.other_unit(battle)
+        damage = int(target.max_hp * 0.4)
+        target.current_hp -= damage
+        battle.event("rocket_launch", damage, target.name, target.current_hp, target.max_hp)
+        return damage
+
+    def cast_dogecoin_pump(self, battle):
+        # Elon Musk: Dogecoin Pump (double ATK for 2 turns)
+        self.add_status(StatusEffect(DOGECOIN_PUMP, charges=2))  # Charges are attacks
+        battle.event("dogecoin_pump")
+        return 1
+
+    def cast_fire_breath(self, battle):
+        # Fire Breath: Deal ATK - DEF damage to enemy
+        target = self.other_unit(battle)
+        damage = max(0, self.stats['ATK'] - target.defense)
+        target.current_hp -= damage
+        battle.event("fire_breath", self.name, damage, target.name, target.current_hp, target.max_hp)
+        return damage
+
+    def cast_power_surge(self, battle):
+        # Power Surge: Double attack for 1 turn
+        self.add_status(StatusEffect(POWER_SURGE, charges=1))
+        battle.event("power_surge", self.name)
+        return 1
+
+    def cast_stat_boost(self, battle):
+        # Michael Saves: Permanently increase all stats by 10
+        for stat in self.stats:
+            self.stats[stat] += 10
+        self.max_hp = self.stats['HP']
+        # If current HP was at max, keep it at new max
+        if self.current_hp == self.max_hp - 10:
+            self.current_hp = self.max_hp
+        battle.event("stat_boost", self.name, self.stats['ATK'], self.defense, self.stats['HP'])
+        # --- Make stat boost permanent in inventory or boss file ---
+        # Only make stat boost permanent for player units (not boss)
+        # Player is always unit1 (index 0) in battle.units
+        if hasattr(battle, 'units') and self is battle.units[0] and battle.on_stat_boost:
+            battle.on_stat_boost(self)
+        return 1
+
+    def __init__(self, unit_data):
+        self.name = unit_data['name']
+        self.stars = unit_data['stars']
+        self.stats = unit_data['stats'].copy()
+        self.ability = unit_data['ability']
+        self.max_hp = self.stats['HP']
+        self.current_hp = self.max_hp
+        self.image = unit_data.get('image')
+        self.effects = []  # Active StatusEffects, sorted by kind.order
+        self.def_bonus = 0  # Sum of the effects' DEF, kept so reading DEF needs no scan
+        self.spell_used_this_turn = False
+
+        # Handle spell data properly
+        spell_data = unit_data.get('spell', unit_data.get('spells'))
+        if isinstance(spell_data, str):
+            self.spells = [spell_data]
+        elif isinstance(spell_data, list):
+            self.spells = spell_data
+        else:
+            self.spells = []
+            
+        # Compile the unit's effect ids into hooks and spell casts
+        self.register_effects(unit_data)
+
+    def register_effects(self, unit_data):
+        passives = unit_data.get('passives')
+        spell_effects = unit_data.get('spell_effects')
+        if passives is None or spell_effects is None:
+            # Older saved units (e.g. a boss spawned before effect ids) take them from the catalog
+            template = next(iter(find_units(self.name, self.stars)), None)
+            passives = template.passives if template else ()
+            spell_effects = template.spell_effects if template else ()
+        self.hooks = {trigger: [] for trigger in TRIGGERS}
+        for effect in passives:
+            if effect not in PASSIVE_EFFECTS:
+                print(f"[battle] Unknown passive effect '{effect}' on {self.name}")
+                continue
+            for trigger, method in PASSIVE_EFFECTS[effect]:
+                self.hooks[trigger].append(getattr(self, method))
+            if effect in STARTING_STATUSES:
+                self.add_status(STARTING_STATUSES[effect]())
+        self.spell_casts = []
+        for i in range(len(self.spells)):
+            method = SPELL_EFFECTS.get(spell_effects[i]) if i < len(spell_effects) else None
+            self.spell_casts.append(getattr(self, method) if method else None)
+
+    # --- Passive Implementations ---
+    def sticky_body(self, attacker, damage, battle):
+        reduced = max(0, damage - self.defense)
+        battle.event("sticky_body", self.name, reduced)
+        return reduced
+
+    def shrek_swamp(self, attacker, damage, battle):
+        # Passive: Reduces enemy ATK by 20% when defending
+        reduced_atk = int(attacker.stats['ATK'] * 0.8)
+        new_damage = max(0, reduced_atk - self.defense)
+        battle.event("swamp", new_damage)
+        return new_damage
+
+    def amongus_sus_attack(self, attacker, damage, battle):
+        # Passive: Chance to instantly defeat enemy on every attack
+        if random.random() < 0.1:  # 10% chance
+            battle.event("sus_attack")
+            if hasattr(battle, 'units'):
+                target = self.other_unit(battle)
+                target.current_hp = 0
+            return 99999  # Overkill damage
+        return damage
+
+    def elon_moon(self, attacker, damage, battle):
+        # Passive: To The Moon - 100% of ATK as bonus damage, then 15% more on top
+        bonus = self.stats['ATK']
+        damage += bonus
+        battle.event("moon_atk", bonus, damage)
+        # 15% more damage, not +15 flat
+        bonus = int(damage * 0.15)
+        total_damage = damage + bonus
+        battle.event("moon_bonus", bonus, total_damage)
+        return total_damage
+
+    def shield_wall(self, attacker, damage, battle):
+        reduced = max(0, damage - 10)
+        battle.event("shield_wall", self.name, reduced)
+        return reduced
+
+    def sneak_attack(self, attacker, damage, battle):
+        # Deals double damage on first hit
+        if self.consume_status(FIRST_STRIKE):
+            doubled = damage * 2
+            battle.event("sneak_attack", self.name, doubled)
+            return doubled
+        return damage
+
+    def arcane_blast(self, attacker, damage, battle):
+        # Ignores 50% of enemy DEF
+        if hasattr(attacker, 'stats') and hasattr(battle, 'units'):
+            defender = battle.units[1 - battle.turn]
+            orig_def = defender.defense
+            reduced_def = orig_def * 0.5
+            base_damage = max(0, attacker.stats['ATK'] - reduced_def)
+            battle.event("arcane_blast", self.name, base_damage)
+            return base_damage
+        return damage
+
+    def inferno(self, attacker, damage, battle):
+        # Deals 30 splash damage to all enemies at the end of the turn
+        # Only apply if this unit is the attacker
+        if hasattr(self, 'name') and 'Dragon' in self.name:
+            for unit in battle.units:
+                if unit is not self:
+                    unit.current_hp -= 30
+                    battle.event("inferno", self.name, unit.name)
+        return damage
+
+    def america_supports(self, attacker, damage, battle):
+        # Double post-mitigation damage
+        boosted = int(damage * 2)
+        battle.event("america_supports", self.name, damage, boosted)
+        return boosted
+
+    def on_attack(self, target, battle):
+        # Called when this unit attacks
+        damage = max(0, self.stats['ATK'] - target.defense)
+        # Damage multipliers (Dogecoin Pump, Power Surge) use a charge per attack
+        for effect in tuple(self.effects):
+            kind = effect.kind
+            if kind.attack_multiplier != 1:
+                damage *= kind.attack_multiplier
+                battle.event(kind.event, self.name)
+                self._use_charge(effect)
+        # Apply passives that modify outgoing damage
+        for hook in self.hooks['on_attack']:
+            damage = hook(self, damage, battle)
+        return damage
+
+    def on_defend(self, attacker, damage, battle):
+        # Called when this unit is attacked
+        # Amongus Vent: dodge next attack
+        for effect in self.effects:
+            if effect.kind.dodge:
+                battle.event(effect.kind.event, self.name)
+                self._use_charge(effect)
+                return 0
+        for hook in self.hooks['on_defend']:
+            damage = hook(attacker, damage, battle)
+        return damage
+
+    def on_turn_start(self, battle):
+        # Called at the start of this unit's turn
+        self.spell_used_this_turn = False
+
+    def on_turn_end(self, battle):
+        # Called at the end of this unit's turn
+        # Count down timed effects (Emergency Meeting's DEF buff)
+        for effect in tuple(self.effects):
+            if effect.turns is not None:
+                effect.turns -= 1
+                if effect.turns <= 0:
+                    self._drop_status(effect)
+                    if effect.kind.expire_event:
+                        battle.event(effect.kind.expire_event, self.name, self.defense)
+
+
+class Battle:
+
+    def __init__(self, unit1, unit2, on_stat_boost=None):
+        self.units = [unit1, unit2]
+        self.turn = 0  # 0 or 1
+        self.log = deque(maxlen=LOG_SIZE)  # (code, args) events, see MESSAGES
+        # Called with the player's unit after a permanent Stat Boost, to save it
+        self.on_stat_boost = on_stat_boost
+        # Second player shield: scales with ATK, DEF, HP
+        atk = unit2.stats.get('ATK', 0)
+        defense = unit2.stats.get('DEF', 0)
+        hp = unit2.stats.get('HP', 0)
+        shield_val = int(0.2 * (atk + defense) + 0.1 * hp)
+        self.second_player_shield = shield_val
+        self.second_player_shield_used = False
+        self.event("shield", unit2.name, shield_val)
+
+    def event(self, code, *args):
+        self.log.append((code, args))
+
+    def recent(self, n=1):
+        """The last `n` events formatted for display, oldest first."""
+        return [format_event(e) for e in reversed(list(islice(reversed(self.log), n)))]
+
+    def next_turn(self):
+        attacker = self.units[self.turn]
+        defender = self.units[1 - self.turn]
+        # Start of turn passives
+        attacker.on_turn_start(self)
+        defender.on_turn_start(self)
+        # Attack phase
+        damage = attacker.on_attack(defender, self)
+        # Second player shield logic: only applies to unit2 (index 1), only on first hit
+        shield_broken = False
+        shield_absorbed = 0
+        if (self.turn == 0 and not self.second_player_shield_used
+                and self.second_player_shield > 0):
+            absorbed = min(damage, self.second_player_shield)
+            damage -= absorbed
+            self.second_player_shield -= absorbed
+            shield_absorbed = absorbed
+            self.second_player_shield_used = True
+            if absorbed > 0:
+                self.event("shield_absorbs", absorbed)
+            if self.second_player_shield <= 0:
+                shield_broken = True
+                self.event("shield_broken")
+        # Passives on defend
+        damage = defender.on_defend(attacker, damage, self)
+        defender.current_hp -= damage
+        # Recap: show shield absorption if any
+        if shield_absorbed > 0:
+            self.event("attack_shielded", attacker.name, defender.name, damage, shield_absorbed, defender.current_hp, defender.max_hp)
+        else:
+            self.event("attack", attacker.name, defender.name, damage, defender.current_hp, defender.max_hp)
+        # End of turn passives
+        attacker.on_turn_end(self)
+        defender.on_turn_end(self)
+        # Special: Dragon's Inferno triggers at end of turn
+        for hook in attacker.hooks['on_turn_end']:
+            hook(attacker, 0, self)
+        self.turn = 1 - self.turn
+        return self.check_winner()
+
+    def check_winner(self):
+        if self.units[0].current_hp <= 0:
+            return 1  # unit2 wins
+        if self.units[1].current_hp <= 0:
+            return 0  # unit1 wins
+        return None
+
+
+def resolve(battle, use_spells=False, max_turns=MAX_TURNS):
+    """Play a battle out from its current state in one pass.
+
+    Returns (winner index or None on a draw, turns) where turns holds one
+    (turn, attacker name, defender name, damage dealt, defender HP left) per
+    turn played. With use_spells, each side casts a random one of its spells
+    before every attack, as a player clicking Spell then Attack would.
+    """
+    turns = []
+    for turn in range(1, max_turns + 1):
+        attacker = battle.units[battle.turn]
+        defender = battle.units[1 - battle.turn]
+        if use_spells and attacker.spells:
+            attacker.use_spell(battle, random.randrange(len(attacker.spells)))
+        before = defender.current_hp
+        winner = battle.next_turn()
+        turns.append((turn, attacker.name, defender.name, before - defender.current_hp, defender.current_hp))
+        if winner is not None:
+            return winner, turns
+    return None, turns
+
+
+def simulate(unit1_data, unit2_data, use_spells=True, max_turns=MAX_TURNS):
+    """Fight one fresh battle to the end; returns (winner index or None on a draw, turns taken)."""
+    winner, turns = resolve(Battle(BattleUnit(unit1_data), BattleUnit(unit2_data)), use_spells, max_turns)
+    return winner, len(turns)
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+
+# Ongoing /fight battles, keyed by (channel_id, user_id). A battle used to stay
+# in the registry forever unless it ended with a winner; now every click marks
+# its session active, sessions idle for longer than SESSION_TTL are dropped
+# (swept every SWEEP_INTERVAL by battle_commands, and also whenever a battle
+# starts or a battle view times out), and at most MAX_SESSIONS run at once.
+# SESSION_TTL is longer than the 120s BattleView timeout, so a battle whose
+# buttons still work is never swept.
+SESSION_TTL = 300  # Seconds without a click before a battle is dropped
+MAX_SESSIONS = 500  # Concurrent battles; new fights are refused beyond this
+SWEEP_INTERVAL = 60  # Seconds between periodic sweeps, so a quiet bot frees idle battles too
+
+
+class BattleSessions:
+    """Battle registry ordered by last activity, oldest first."""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions = OrderedDict()  # {key: [battle, last active]}
+        self.stats = {"started": 0, "finished": 0, "expired": 0, "rejected": 0}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def start(self, key, battle):
+        """Register a new battle; returns False when the cap is reached."""
+        now = self.clock()
+        self.sweep(now)
+        if key in self._sessions:
+            # Starting a new fight replaces your previous one in this channel
+            del self._sessions[key]
+        elif len(self._sessions) >= self.max_sessions:
+            self.stats["rejected"] += 1
+            return False
+        self._sessions[key] = [battle, now]
+        self.stats["started"] += 1
+        return True
+
+    def touch(self, key, battle):
+        """Mark `battle` active; False if its session was swept or replaced."""
+        session = self._sessions.get(key)
+        if session is None or session[0] is not battle:
+            return False
+        session[1] = self.clock()
+        self._sessions.move_to_end(key)
+        return True
+
+    def end(self, key, battle):
+        # Only if `key` still holds this battle, not a newer one that replaced it
+        session = self._sessions.get(key)
+        if session is not None and session[0] is battle:
+            del self._sessions[key]
+            self.stats["finished"] += 1
+
+    def sweep(self, now=None):
+        """Drop sessions idle for longer than the TTL; returns how many were dropped."""
+        cutoff = (self.clock() if now is None else now) - self.ttl
+        dropped = 0
+        while self._sessions:
+            key, (_, last_active) = next(iter(self._sessions.items()))
+            if last_active > cutoff:
+                break
+            del self._sessions[key]
+            dropped += 1
+        self.stats["expired"] += dropped
+        return dropped
+
+    def counts(self):
+        return {"active": len(self._sessions), **self.stats}
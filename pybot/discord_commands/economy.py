@@ -0,0 +1,100 @@
+import time
+import threading
+from . import leaderboard, storage
+
+# Authoritative in-memory points and bot bank, shared by every command module.
+# Every change is recorded as a (user, delta, reason, timestamp) ledger entry;
+# storage's flush thread appends pending entries to the ledger every few
+# seconds and periodically compacts the ledger into the balance snapshot.
+# Startup loads the snapshot and replays the ledger tail on top of it.
+COMPACT_EVERY = 5000  # Ledger entries written before compacting
+COMPACT_INTERVAL = 600  # Seconds between compactions while anything is logged
+
+_lock = threading.Lock()
+_points = None
+_bot_bank = 0
+_pending = []
+_ledger_size = 0
+_last_compact = 0.0
+
+
+def load():
+    global _points, _bot_bank, _ledger_size, _last_compact
+    with _lock:
+        if _points is not None:
+            return
+        points = storage.load_points()
+        bot_bank = storage.get_bot_bank()
+        ledger = storage.load_ledger()
+        for user_id, delta, reason, ts in ledger:
+            if user_id == storage.BANK_ACCOUNT:
+                bot_bank += delta
+            else:
+                points[user_id] = points.get(user_id, 0) + delta
+        _points, _bot_bank = points, bot_bank
+        leaderboard.load(points=points)
+        _ledger_size = len(ledger)
+        _last_compact = time.time()
+    storage.register_flush(flush)
+
+
+def _ensure_loaded():
+    if _points is None:
+        load()
+
+
+def get_points(user_id):
+    _ensure_loaded()
+    return _points.get(str(user_id), 0)
+
+
+def has_points(user_id):
+    _ensure_loaded()
+    return str(user_id) in _points
+
+
+def add_points(user_id, delta, reason):
+    """Apply a point change (reason: farm, gamble, slot, summon, prestige, boss_jackpot, ...)."""
+    _ensure_loaded()
+    user_id = str(user_id)
+    with _lock:
+        amount = _points.get(user_id, 0) + delta
+        _points[user_id] = amount
+        leaderboard.set_points(user_id, amount)
+        _pending.append((user_id, delta, reason, time.time()))
+    return amount
+
+
+def get_bot_bank():
+    _ensure_loaded()
+    return _bot_bank
+
+
+def add_bot_bank(delta, reason):
+    global _bot_bank
+    _ensure_loaded()
+    with _lock:
+        _bot_bank += delta
+        _pending.append((storage.BANK_ACCOUNT, delta, reason, time.time()))
+        return _bot_bank
+
+
+def flush():
+    global _pending, _ledger_size, _last_compact
+    if _points is None:
+        return
+    with _lock:
+        entries, _pending = _pending, []
+    if entries:
+        try:
+            storage.append_ledger(entries)
+        except Exception:
+            # Put the entries back in front so the next flush retries them in order
+            with _lock:
+                _pending[:0] = entries
+            raise
+        _ledger_size += len(entries)
+    if _ledger_size >= COMPACT_EVERY or (_ledger_size and time.time() - _last_compact >= COMPACT_INTERVAL):
+        storage.compact_ledger()
+        _ledger_size = 0
+        _last_compact = time.time()
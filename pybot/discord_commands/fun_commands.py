@@ -1,30 +1,13 @@
 import discord
 import random
-import json
-import os
+from . import async_storage, economy, leaderboard
 
 def register_fun_commands(client, GUILD_ID):
-    DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-    DATA_FILE = os.path.join(DATA_DIR, "points_data.json")
-    def load_data():
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, "r") as f:
-                data = json.load(f)
-                return data.get("user_points", {}), data.get("bot_bank", {"amount": 0})
-        return {}, {"amount": 0}
-
-    def save_data():
-        with open(DATA_FILE, "w") as f:
-            json.dump({"user_points": user_points, "bot_bank": bot_bank}, f)
-
-    user_points, bot_bank = load_data()
     class SlotButton(discord.ui.Button):
         def __init__(self, user_id):
             super().__init__(label="🎰 Slot Machine", style=discord.ButtonStyle.success)
             self.user_id = user_id
         async def callback(self, interaction):
-            nonlocal user_points, bot_bank
-            user_points, bot_bank = load_data()
             symbols = ["🍒", "🍋", "🔔", "⭐", "🍀", "💎"]
             spin = [random.choice(symbols) for _ in range(3)]
             result = " ".join(spin)
@@ -34,11 +17,10 @@ def register_fun_commands(client, GUILD_ID):
             elif spin[0] == spin[1] or spin[1] == spin[2] or spin[0] == spin[2]:
                 payout = 300
             from .prestige_commands import get_point_multiplier
-            multiplier = get_point_multiplier(str(self.user_id))
-            prestige_payout = int(payout * multiplier)
-            points = user_points.get(self.user_id, 0)
-            user_points[self.user_id] = points + prestige_payout
-            save_data()
+            async with async_storage.user_lock(self.user_id):
+                multiplier = get_point_multiplier(str(self.user_id))
+                prestige_payout = int(payout * multiplier)
+                points = economy.add_points(self.user_id, prestige_payout, "slot")
             if spin[0] == spin[1] == spin[2]:
                 msg = f"JACKPOT! {result} You win {prestige_payout} points!"
             elif spin[0] == spin[1] or spin[1] == spin[2] or spin[0] == spin[2]:
@@ -52,7 +34,7 @@ def register_fun_commands(client, GUILD_ID):
                         loop.create_task(play_dang_it_audio(interaction.client))
                 except Exception as e:
                     print(f"Error playing dang_it.wav: {e}")
-            await interaction.response.edit_message(content=f"{msg}\n💰 Your points: {user_points[self.user_id]}", view=GambleView(self.user_id))
+            await interaction.response.edit_message(content=f"{msg}\n💰 Your points: {points}", view=GambleView(self.user_id))
 
     class GambleView(discord.ui.View):
         def __init__(self, user_id):
@@ -63,10 +45,10 @@ def register_fun_commands(client, GUILD_ID):
         def update_buttons(self):
             self.clear_items()
             self.add_item(FarmButton(self.user_id))
-            self.add_item(GambleButton(self.user_id, 0.1, label="🚫💸Gamble 10%", bot_bank=bot_bank))
-            self.add_item(GambleButton(self.user_id, 0.25, label="🎲 Gamble 25%", bot_bank=bot_bank))
-            self.add_item(GambleButton(self.user_id, 0.5, label="🎲🎲 Gamble 50%", bot_bank=bot_bank))
-            self.add_item(GambleButton(self.user_id, 1.0, label="🎲🎲🎲 All In", bot_bank=bot_bank, style=discord.ButtonStyle.primary))
+            self.add_item(GambleButton(self.user_id, 0.1, label="🚫💸Gamble 10%"))
+            self.add_item(GambleButton(self.user_id, 0.25, label="🎲 Gamble 25%"))
+            self.add_item(GambleButton(self.user_id, 0.5, label="🎲🎲 Gamble 50%"))
+            self.add_item(GambleButton(self.user_id, 1.0, label="🎲🎲🎲 All In", style=discord.ButtonStyle.primary))
             self.add_item(SlotButton(self.user_id))
             self.add_item(LeaderboardButton())
 
@@ -74,23 +56,25 @@ def register_fun_commands(client, GUILD_ID):
         def __init__(self):
             super().__init__(label="🏆 Leaderboard", style=discord.ButtonStyle.secondary)
         async def callback(self, interaction):
-            nonlocal user_points, bot_bank
-            user_points, bot_bank = load_data()
-            from .prestige_commands import get_user_prestige
-            # Sort users by prestige, then points, descending
-            top = sorted(user_points.items(), key=lambda x: (get_user_prestige(x[0]), x[1]), reverse=True)[:10]
+            from .prestige_commands import load_prestige_index
+            load_prestige_index()
+            bot_bank = economy.get_bot_bank()
+            top = leaderboard.top(10)
             embed = discord.Embed(title="🏆 Leaderboard", color=discord.Color.gold())
             lines = []
             # Add bot bank as the first entry
-            lines.append(f"**🤖 Bot Bank** — {bot_bank['amount']} points")
+            lines.append(f"**🤖 Bot Bank** — {bot_bank} points")
             if not top:
                 lines.append("No users have points yet.")
             else:
-                for idx, (uid, pts) in enumerate(top, 1):
+                for idx, (uid, pts, prestige) in enumerate(top, 1):
                     member = interaction.guild.get_member(int(uid)) if interaction.guild else None
                     name = member.display_name if member else f"User {uid}"
-                    prestige = get_user_prestige(uid)
                     lines.append(f"**{idx}. {name}** — {pts} points | Prestige: {prestige}")
+                # Show the caller's own position when they're outside the top 10
+                own = leaderboard.rank(interaction.user.id)
+                if own and own[0] > len(top):
+                    lines.append(f"…\n**{own[0]}. You** — {own[1]} points | Prestige: {own[2]}")
             embed.description = "\n".join(lines)
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -101,10 +85,7 @@ def register_fun_commands(client, GUILD_ID):
             super().__init__(label="🌾Farm Points", style=discord.ButtonStyle.success)
             self.user_id = user_id
         async def callback(self, interaction):
-            nonlocal user_points, bot_bank
-            user_points, bot_bank = load_data()
             import random
-            points = user_points.get(self.user_id, 0)
             luck = random.random()
             if luck < 0.01:
                 gain = random.randint(1000, 5000)
@@ -115,34 +96,36 @@ def register_fun_commands(client, GUILD_ID):
             else:
                 gain = random.randint(1, 50)
             from .prestige_commands import get_point_multiplier
-            multiplier = get_point_multiplier(str(self.user_id))
-            prestige_gain = int(gain * multiplier)
-            user_points[self.user_id] = points + prestige_gain
-            save_data()
-            await interaction.response.edit_message(content=f"🌾 You farmed {prestige_gain} points!\n💰 Current points: {user_points[self.user_id]}", view=GambleView(self.user_id))
+            async with async_storage.user_lock(self.user_id):
+                multiplier = get_point_multiplier(str(self.user_id))
+                prestige_gain = int(gain * multiplier)
+                points = economy.add_points(self.user_id, prestige_gain, "farm")
+            await interaction.response.edit_message(content=f"🌾 You farmed {prestige_gain} points!\n💰 Current points: {points}", view=GambleView(self.user_id))
 
     class GambleButton(discord.ui.Button):
-        def __init__(self, user_id, percent, label, bot_bank, style=discord.ButtonStyle.danger):
+        def __init__(self, user_id, percent, label, style=discord.ButtonStyle.danger):
             super().__init__(label=label, style=style)
             self.user_id = user_id
             self.percent = percent
-            self.bot_bank = bot_bank
         async def callback(self, interaction):
-            nonlocal user_points, bot_bank
-            user_points, bot_bank = load_data()
             import random
-            points = user_points.get(self.user_id, 0)
-            gamble_amount = max(1, int(points * self.percent))
-            if points < gamble_amount:
-                await interaction.response.edit_message(content=f"❌ Not enough points to gamble!\n💰 Current points: {points}\n🏦 Bot Bank: {self.bot_bank['amount']}", view=GambleView(self.user_id))
+            async with async_storage.user_lock(self.user_id):
+                points = economy.get_points(self.user_id)
+                gamble_amount = max(1, int(points * self.percent))
+                can_gamble = points >= gamble_amount
+                if can_gamble:
+                    win = random.random() < 0.45  # 45% win chance
+                    if win:
+                        points = economy.add_points(self.user_id, gamble_amount, "gamble")
+                    else:
+                        points = economy.add_points(self.user_id, -gamble_amount, "gamble")
+                        economy.add_bot_bank(gamble_amount, "gamble")
+            if not can_gamble:
+                await interaction.response.edit_message(content=f"❌ Not enough points to gamble!\n💰 Current points: {points}\n🏦 Bot Bank: {economy.get_bot_bank()}", view=GambleView(self.user_id))
                 return
-            win = random.random() < 0.45  # 45% win chance
             if win:
-                user_points[self.user_id] = points + gamble_amount
                 msg = f"You WON! You gained {gamble_amount} points!"
             else:
-                user_points[self.user_id] = points - gamble_amount
-                self.bot_bank["amount"] += gamble_amount
                 msg = f"You LOST! You lost {gamble_amount} points!"
                 try:
                     from audio_actions import play_dang_it_audio
@@ -151,19 +134,16 @@ def register_fun_commands(client, GUILD_ID):
                         loop.create_task(play_dang_it_audio(interaction.client))
                 except Exception as e:
                     print(f"Error playing dang_it.wav: {e}")
-            save_data()
-            await interaction.response.edit_message(content=f"{msg}\n💰 Current points: {user_points[self.user_id]}\n🏦 Bot Bank: {self.bot_bank['amount']}", view=GambleView(self.user_id))
+            await interaction.response.edit_message(content=f"{msg}\n💰 Current points: {points}\n🏦 Bot Bank: {economy.get_bot_bank()}", view=GambleView(self.user_id))
 
     @client.tree.command(name="gamble", description="Open the gambling panel", guild=GUILD_ID)
     async def gamble(interaction: discord.Interaction):
-        nonlocal user_points, bot_bank
-        user_points, bot_bank = load_data()
         user_id = str(interaction.user.id)
-        if user_id not in user_points:
-            user_points[user_id] = 100  # Start with 100 points
-            save_data()
+        async with async_storage.user_lock(user_id):
+            if not economy.has_points(user_id):
+                economy.add_points(user_id, 100, "signup")  # Start with 100 points
         view = GambleView(user_id)
-        await interaction.response.send_message(f"Gambling Panel\n💰 Current points: {user_points[user_id]}\n🏦 Bot Bank: {bot_bank['amount']}", view=view, ephemeral=True)
+        await interaction.response.send_message(f"Gambling Panel\n💰 Current points: {economy.get_points(user_id)}\n🏦 Bot Bank: {economy.get_bot_bank()}", view=view, ephemeral=True)
         # Play Gambling.mp3 after the panel opens
         try:
             from audio_actions import play_gambling_audio
@@ -1,236 +1,101 @@
 import discord
 from discord import app_commands
-import json
 import random
-import os
+from . import async_storage, economy, image_assets, inventory, unit_catalog
+from .inventory import STATS
+from .unit_catalog import complete_units, find_units, get_unit, resolve_unit
+from .gacha_sampler import summon_counts, unit_odds
+from .merge_engine import merge_duplicates
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-POINTS_FILE = os.path.join(DATA_DIR, "points_data.json")
-DATA_FILE = os.path.join(DATA_DIR, "gacha_inventory.json")
-UNIT_POOL = [
-    {
-        "name": "Slime",
-        "stars": 1,
-        "image": "images/Slime.png",
-        "stats": {"HP": 50, "ATK": 10, "DEF": 5},
-        "ability": "Sticky Body: Double Defence.",
-        "spell": "Heal: Restore 30% HP"
-    },
-    {
-        "name": "Goblin",
-        "stars": 2,
-        "image": "images/Goblin.png",
-        "stats": {"HP": 80, "ATK": 20, "DEF": 10},
-        "ability": "Sneak Attack: Deals double damage on first hit."
-    },
-    {
-        "name": "Knight",
-        "stars": 3,
-        "image": "images/Knight.png",
-        "stats": {"HP": 120, "ATK": 35, "DEF": 25},
-        "ability": "Shield Wall: Reduces incoming damage by 10.",
-        "spell": "Power Surge: Double attack for 1 turn"
-    },
-    {
-        "name": "Mage",
-        "stars": 4,
-        "image": "images/Mage.png",
-        "stats": {"HP": 90, "ATK": 50, "DEF": 10},
-        "ability": "Arcane Blast: Ignores 50% of enemy DEF.",
-        "spell": "Heal: Restore 30% HP"
-    },
-    {
-        "name": "Dragon",
-        "stars": 5,
-        "image": "images/Dragon.png",
-        "stats": {"HP": 200, "ATK": 80, "DEF": 40},
-        "ability": "Inferno: Deals 30 splash damage to all enemies at the end of the turn.",
-        "spell": "Fire Breath: Deal damage equal to ATK (reduced by enemy DEF)"
-    },
-    {
-        "name": "Michael Saves",
-        "stars": 6,
-        "image": "images/Michael_Saves.png",
-        "stats": {"HP": 250, "ATK": 100, "DEF": 60},
-        "ability": "America supports Michael Saves: Double Post Mitigation Damage.; Sticky Body: Double Defence.",
-        "spell": [
-            "Heal: Restore 30% HP",
-            "Power Surge: Double attack for 1 turn",
-            "Stat Boost: Permanently increase all stats by 10"
-        ]
-    },
-    {
-        "name": "Shrek",
-        "stars": 4,
-        "image": "images/Shrek.png",
-        "stats": {"HP": 160, "ATK": 45, "DEF": 35},
-        "ability": "Get Out Of My Swamp: Reduces enemy ATK by 20%.",
-        "spell": [
-            "Swamp Heal: Restore 40% HP",
-            "Onion Smash: Deal double ATK as damage"
-        ]
-    },
-    {
-        "name": "Amongus",
-        "stars": 2,
-        "image": "images/Amongus.png",
-        "stats": {"HP": 70, "ATK": 18, "DEF": 12},
-        "ability": "Sus Attack: Has a chance to instantly defeat the enemy.",
-        "spell": [
-            "Emergency Meeting: Heal 40% HP and gain +10% DEF for 1 turn",
-            "Vent: 50% chance to dodge next attack"
-        ]
-    },
-    {
-        "name": "Elon Musk",
-        "stars": 5,
-        "image": "images/Elon_Musk.png",
-        "stats": {"HP": 180, "ATK": 65, "DEF": 30},
-        "ability": "To The Moon: Deals 15% more damage on attack and Rocket Launch deals bonus damage equal to 100% of ATK.",
-        "spell": [
-            "Rocket Launch: Deal bonus damage equal to 100% of ATK (ignores DEF)",
-            "Dogecoin Pump: Double ATK for 2 turns"
-        ]
-    },
-]
-STAR_RATES = [
-    (1, 0.35),  # 35% chance for 1-star
-    (2, 0.25),  # 25% for 2-star
-    (3, 0.20),  # 20% for 3-star
-    (4, 0.12),  # 12% for 4-star
-    (5, 0.07),  # 7% for 5-star
-    (6, 0.01),  # 1% for 6-star
-]
 SUMMON_COST = 50  # Points per summon
+MAX_MASS_SUMMON = 100000  # Most pulls one /mass_summon may do
+MESSAGE_LIMIT = 2000  # Discord's message length cap
+INVENTORY_PAGE_LINES = 20  # Unit lines per /inventory page
+USERS_PER_PAGE = 5  # Users per /all_inventories page
 
-def load_points():
-    if os.path.exists(POINTS_FILE):
-        with open(POINTS_FILE, "r") as f:
-            data = json.load(f)
-            return data.get("user_points", {})
-    return {}
+def unit_choices(units):
+    return [app_commands.Choice(name=f"{u.name} ({u.stars}⭐)", value=u.name) for u in units]
 
-def save_points(user_points):
-    if os.path.exists(POINTS_FILE):
-        with open(POINTS_FILE, "r") as f:
-            data = json.load(f)
-    else:
-        data = {}
-    data["user_points"] = user_points
-    with open(POINTS_FILE, "w") as f:
-        json.dump(data, f)
+async def unit_name_autocomplete(interaction: discord.Interaction, current: str):
+    # Any catalog unit whose name (or a word of it) starts with what was typed
+    return unit_choices(complete_units(current))
 
-def load_inventory():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
+async def owned_unit_autocomplete(interaction: discord.Interaction, current: str):
+    # Only units the caller owns; the id set is built from the cached inventory
+    owned = {get_unit(unit_id).id for unit_id in await async_storage.owned_unit_ids(interaction.user.id)}
+    return unit_choices(complete_units(current, unit_ids=owned))
 
-def save_inventory(inventory):
-    with open(DATA_FILE, "w") as f:
-        json.dump(inventory, f)
+def summary_lines(counts):
+    # Show a summary by unit name and stars
+    summary = {}
+    for unit_id, count in counts.items():
+        unit = get_unit(unit_id)
+        key = (unit.name, unit.stars)
+        summary[key] = summary.get(key, 0) + count
+    return [f"{name} ({stars}⭐) x{count}" for (name, stars), count in sorted(summary.items(), key=lambda x: (-x[0][1], x[0][0]))]
 
-def get_random_unit():
-    roll = random.random()
-    cumulative = 0.0
-    for stars, rate in STAR_RATES:
-        cumulative += rate
-        if roll < cumulative:
-            candidates = [u for u in UNIT_POOL if u["stars"] == stars]
-            return random.choice(candidates)
-    return random.choice([u for u in UNIT_POOL if u["stars"] == 1])
+class PageView(discord.ui.View):
+    """Prev/next pager; `render(page)` builds the text of a single page on demand."""
+    def __init__(self, page_count, render, page=0):
+        super().__init__(timeout=180)
+        self.page_count = page_count
+        self.render = render
+        self.page = page
+        self.add_item(PageButton("◀ Prev", -1, disabled=page <= 0))
+        self.add_item(PageButton("Next ▶", 1, disabled=page >= page_count - 1))
+
+    def content(self):
+        text = self.render(self.page)
+        footer = f"\n\nPage {self.page + 1}/{self.page_count}" if self.page_count > 1 else ""
+        limit = MESSAGE_LIMIT - len(footer)
+        if len(text) > limit:
+            # Pages are sized well below the limit; this only guards unusual data.
+            # Cut after the last whole line that fits, keeping the page footer
+            text = text[:limit - 2]
+            cut = text.rfind("\n")
+            text = (text[:cut] if cut > 0 else text) + "\n…"
+        return text + footer
+
+class PageButton(discord.ui.Button):
+    def __init__(self, label, step, disabled=False):
+        super().__init__(label=label, style=discord.ButtonStyle.secondary, disabled=disabled)
+        self.step = step
+    async def callback(self, interaction):
+        old = self.view
+        view = PageView(old.page_count, old.render, min(max(old.page + self.step, 0), old.page_count - 1))
+        await interaction.response.edit_message(content=view.content(), view=view)
+
+def send_pages(interaction, page_count, render):
+    view = PageView(page_count, render)
+    return interaction.response.send_message(view.content(), view=view if page_count > 1 else discord.utils.MISSING, ephemeral=True)
 
-def get_unit_image_path(unit):
-    # Returns absolute path for unit image, using same logic as DATA_FILE
-    path = os.path.join(os.path.dirname(__file__), unit['image'])
-    return path
-def sync_unit_metadata_to_inventory():
-    inventory = load_inventory()
-    updated = False
-    # Build a lookup for UNIT_POOL by (name, stars)
-    pool_lookup = {(u["name"], u["stars"]): u for u in UNIT_POOL}
-    for user_id, units in inventory.items():
-        for unit in units:
-            key = (unit.get("name"), unit.get("stars"))
-            pool_unit = pool_lookup.get(key)
-            if pool_unit:
-                # Sync all non-stat fields (skip 'stats')
-                for field in pool_unit:
-                    if field != "stats" and unit.get(field) != pool_unit[field]:
-                        unit[field] = pool_unit[field]
-                        updated = True
-    if updated:
-        save_inventory(inventory)
-        print("Synced all non-stat fields from UNIT_POOL to inventory units.")
-    else:
-        print("No inventory units needed updating.")
 # Register gacha commands
 
 def register_gacha_commands(client, GUILD_ID):
     @client.tree.command(name="buff_all_units", description="Buff all units in your inventory by combining duplicates!", guild=GUILD_ID)
     async def buff_all_units(interaction: discord.Interaction):
         user_id = str(interaction.user.id)
-        inventory = load_inventory()
-        user_units = inventory.get(user_id, [])
-        # Group units by (name, stars)
-        groups = {}
-        for u in user_units:
-            key = (u['name'].lower(), u['stars'])
-            groups.setdefault(key, []).append(u)
-        buffed_any = False
-        messages = []
-        new_units = user_units.copy()
-        for (name, stars), matches in groups.items():
-            if len(matches) < 2:
-                continue
-            buffed_any = True
-            to_buff = matches[0]
-            num_to_remove = len(matches) - 1
-            # Remove all but one from inventory
-            removed = 0
-            temp_units = []
-            for u in new_units:
-                if u is to_buff:
-                    temp_units.append(u)
-                elif u['name'].lower() == name and u['stars'] == stars and removed < num_to_remove:
-                    removed += 1
-                    continue
-                else:
-                    temp_units.append(u)
-            new_units = temp_units
-            # Buff: for each unit being combined, randomly select a stat and add stars to to_buff
-            stat_increases = {"HP": 0, "ATK": 0, "DEF": 0}
-            for _ in range(num_to_remove):
-                stat = random.choice(["HP", "ATK", "DEF"])
-                stat_increases[stat] += stars
-            # Apply buffs and build message
-            buff_msgs = []
-            for stat in ["HP", "ATK", "DEF"]:
-                if stat_increases[stat] > 0:
-                    old_val = to_buff["stats"][stat] - stat_increases[stat]
-                    new_val = to_buff["stats"][stat]
-                    to_buff["stats"][stat] += stat_increases[stat]
-                    buff_msgs.append(f"{stat} +{stat_increases[stat]}")
-            messages.append(f"{to_buff['name']} ({stars}⭐): {'; '.join(buff_msgs)} (combined {len(matches)} copies)")
-        if not buffed_any:
+        async with async_storage.user_lock(user_id):
+            stacks, messages, merged = merge_duplicates(await async_storage.get_units(user_id))
+            if messages:
+                inventory.set_units(user_id, stacks, merged)
+        if not messages:
             await interaction.response.send_message("❌ You need at least two of a unit (same name and star) to buff anything!", ephemeral=True)
             return
-        inventory[user_id] = new_units
-        save_inventory(inventory)
         await interaction.response.send_message(
             "✨ Buff results for all units:\n" + "\n".join(messages), ephemeral=True
         )
     @client.tree.command(name="strongest_units", description="Show your strongest unit for each name", guild=GUILD_ID)
     async def strongest_units(interaction: discord.Interaction):
         user_id = str(interaction.user.id)
-        inventory = load_inventory()
-        units = inventory.get(user_id, [])
-        if not units:
+        stacks = await async_storage.get_units(user_id)
+        if not stacks:
             await interaction.response.send_message("Your inventory is empty!", ephemeral=True)
             return
         # Find strongest unit for each name (by total stats)
         best_units = {}
-        for unit in units:
+        for stack in stacks:
+            unit = resolve_unit(stack)
             name = unit["name"]
             total_stats = sum(unit["stats"].values())
             if name not in best_units or total_stats > sum(best_units[name]["stats"].values()):
@@ -243,80 +108,72 @@ def register_gacha_commands(client, GUILD_ID):
         await interaction.response.send_message("Your strongest units:\n" + "\n".join(lines), ephemeral=True)
     @client.tree.command(name="buff_unit", description="Combine all identical units (by name and star) to buff one!", guild=GUILD_ID)
     @app_commands.describe(name="Name of the unit to buff (case-insensitive)")
+    @app_commands.autocomplete(name=owned_unit_autocomplete)
     async def buff_unit(interaction: discord.Interaction, name: str):
         user_id = str(interaction.user.id)
-        inventory = load_inventory()
-        user_units = inventory.get(user_id, [])
-        # Group units by (name, stars)
-        groups = {}
-        for u in user_units:
-            if u['name'].lower() == name.lower():
-                key = u['stars']
-                groups.setdefault(key, []).append(u)
-        buffed_any = False
-        messages = []
-        new_units = user_units.copy()
-        for stars, matches in groups.items():
-            if len(matches) < 2:
-                continue
-            buffed_any = True
-            to_buff = matches[0]
-            num_to_remove = len(matches) - 1
-            # Remove all but one from inventory
-            removed = 0
-            temp_units = []
-            for u in new_units:
-                if u is to_buff:
-                    temp_units.append(u)
-                elif u['name'].lower() == name.lower() and u['stars'] == stars and removed < num_to_remove:
-                    removed += 1
-                    continue
-                else:
-                    temp_units.append(u)
-            new_units = temp_units
-            # Buff: for each unit being combined, randomly select a stat and add stars to to_buff
-            stat_increases = {"HP": 0, "ATK": 0, "DEF": 0}
-            for _ in range(num_to_remove):
-                stat = random.choice(["HP", "ATK", "DEF"])
-                stat_increases[stat] += stars
-            # Apply buffs and build message
-            buff_msgs = []
-            for stat in ["HP", "ATK", "DEF"]:
-                if stat_increases[stat] > 0:
-                    old_val = to_buff["stats"][stat] - stat_increases[stat]
-                    new_val = to_buff["stats"][stat]
-                    to_buff["stats"][stat] += stat_increases[stat]
-                    buff_msgs.append(f"{stat} +{stat_increases[stat]}")
-            messages.append(f"{name} ({stars}⭐): {'; '.join(buff_msgs)} (combined {len(matches)} copies)")
-        if not buffed_any:
+        unit_ids = {u.id for u in find_units(name)}
+        async with async_storage.user_lock(user_id):
+            stacks, messages, merged = merge_duplicates(await async_storage.get_units(user_id), unit_ids)
+            if messages:
+                inventory.set_units(user_id, stacks, merged)
+        if not messages:
             await interaction.response.send_message("❌ You need at least two of a unit (same name and star) to buff!", ephemeral=True)
             return
-        inventory[user_id] = new_units
-        save_inventory(inventory)
         await interaction.response.send_message(
             "✨ Buff results:\n" + "\n".join(messages), ephemeral=True
         )
+    @client.tree.command(name="auto_merge", description="Automatically combine duplicates every time you summon", guild=GUILD_ID)
+    @app_commands.describe(enabled="Turn auto-merge on or off")
+    async def auto_merge(interaction: discord.Interaction, enabled: bool):
+        user_id = str(interaction.user.id)
+        await async_storage.set_setting(user_id, "auto_merge", enabled)
+        if enabled:
+            await interaction.response.send_message("✅ Auto-merge is on: duplicates are combined after every summon.", ephemeral=True)
+        else:
+            await interaction.response.send_message("✅ Auto-merge is off.", ephemeral=True)
     @client.tree.command(name="all_inventories", description="Show all users' summoned units", guild=GUILD_ID)
     async def all_inventories(interaction: discord.Interaction):
-        # Sync all non-stat fields before displaying inventories
-        sync_unit_metadata_to_inventory()
-        inventory = load_inventory()
-        if not inventory:
+        user_ids = await async_storage.users_with_units()
+        if not user_ids:
             await interaction.response.send_message("No inventories found!", ephemeral=True)
             return
-        lines = []
-        for user_id, units in inventory.items():
-            # Count each unit by name and stars
-            unit_counts = {}
-            for unit in units:
-                key = (unit['name'], unit['stars'])
-                unit_counts[key] = unit_counts.get(key, 0) + 1
-            unit_lines = [f"{name} ({stars}⭐) x{count}" for (name, stars), count in sorted(unit_counts.items(), key=lambda x: (-x[0][1], x[0][0]))]
-            # Try to get user mention if possible
-            member = interaction.guild.get_member(int(user_id)) if interaction.guild else None
-            user_display = member.mention if member else f"User {user_id}"
-            lines.append(f"**{user_display}**\n" + "\n".join(unit_lines))
-        await interaction.response.send_message("All Inventories:\n" + "\n\n".join(lines), ephemeral=True)
+        def render(page):
+            # Only the users on this page are formatted, from their cached summaries
+            blocks = []
+            for user_id in user_ids[page * USERS_PER_PAGE:(page + 1) * USERS_PER_PAGE]:
+                # Try to get user mention if possible
+                member = interaction.guild.get_member(int(user_id)) if interaction.guild else None
+                user_display = member.mention if member else f"User {user_id}"
+                blocks.append(f"**{user_display}**\n" + "\n".join(summary_lines(inventory.summary(user_id))))
+            return "All Inventories:\n" + "\n\n".join(blocks)
+        await send_pages(interaction, -(-len(user_ids) // USERS_PER_PAGE), render)
+    async def summon_units(user_id, pulls):
+        """Charge `pulls` summons and add them in one batch.
+
+        Returns ({unit_id: count}, points), or (None, points) if the user can't afford it.
+        Users with auto-merge on get the pulled units merged into their copies right away.
+        """
+        async with async_storage.user_lock(user_id):
+            points = economy.get_points(user_id)
+            if points < SUMMON_COST * pulls:
+                return None, points
+            auto_merge = await async_storage.get_setting(user_id, "auto_merge", False)
+            await async_storage.preload_units(user_id)
+            counts = summon_counts(pulls)
+            inventory.add_unit_counts(user_id, counts)
+            if auto_merge:
+                stacks, messages, merged = merge_duplicates(inventory.get_units(user_id), set(counts))
+                if messages:
+                    inventory.set_units(user_id, stacks, merged)
+            points = economy.add_points(user_id, -SUMMON_COST * pulls, "summon")
+        return counts, points
+
+    def pull_order(counts):
+        # A random ordering of multinomial counts is distributed exactly like sequential pulls
+        units = [get_unit(unit_id) for unit_id, count in counts.items() for _ in range(count)]
+        random.shuffle(units)
+        return units
+
     class SummonView(discord.ui.View):
         def __init__(self, user_id):
             super().__init__(timeout=60)
@@ -331,157 +188,111 @@ def register_gacha_commands(client, GUILD_ID):
             super().__init__(label="1000 Pull", style=discord.ButtonStyle.danger)
             self.user_id = user_id
         async def callback(self, interaction):
-            inventory = load_inventory()
-            user_points = load_points()
-            points = user_points.get(self.user_id, 0)
             total_cost = SUMMON_COST * 1000
-            if points < total_cost:
+            results, points = await summon_units(self.user_id, 1000)
+            if results is None:
                 await interaction.response.edit_message(content=f"❌ Not enough points! You need {total_cost} points for 1000 pulls.", view=SummonView(self.user_id))
                 return
-            results = []
-            for _ in range(1000):
-                unit = get_random_unit()
-                results.append(unit)
-                if self.user_id not in inventory:
-                    inventory[self.user_id] = []
-                inventory[self.user_id].append(unit)
-            user_points[self.user_id] = points - total_cost
-            save_points(user_points)
-            save_inventory(inventory)
-            # Show a summary by unit name and stars
-            summary = {}
-            for unit in results:
-                key = (unit['name'], unit['stars'])
-                summary[key] = summary.get(key, 0) + 1
-            lines = [f"{name} ({stars}⭐) x{count}" for (name, stars), count in sorted(summary.items(), key=lambda x: (-x[0][1], x[0][0]))]
-            await interaction.response.edit_message(content=f"✨ 1000 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {user_points[self.user_id]}", view=SummonView(self.user_id))
+            lines = summary_lines(results)
+            await interaction.response.edit_message(content=f"✨ 1000 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {points}", view=SummonView(self.user_id))
 
     class HundredPullButton(discord.ui.Button):
         def __init__(self, user_id):
             super().__init__(label="100 Pull", style=discord.ButtonStyle.danger)
             self.user_id = user_id
         async def callback(self, interaction):
-            inventory = load_inventory()
-            user_points = load_points()
-            points = user_points.get(self.user_id, 0)
             total_cost = SUMMON_COST * 100
-            if points < total_cost:
+            results, points = await summon_units(self.user_id, 100)
+            if results is None:
                 await interaction.response.edit_message(content=f"❌ Not enough points! You need {total_cost} points for 100 pulls.", view=SummonView(self.user_id))
                 return
-            results = []
-            for _ in range(100):
-                unit = get_random_unit()
-                results.append(unit)
-                if self.user_id not in inventory:
-                    inventory[self.user_id] = []
-                inventory[self.user_id].append(unit)
-            user_points[self.user_id] = points - total_cost
-            save_points(user_points)
-            save_inventory(inventory)
-            # Show a summary by unit name and stars
-            summary = {}
-            for unit in results:
-                key = (unit['name'], unit['stars'])
-                summary[key] = summary.get(key, 0) + 1
-            lines = [f"{name} ({stars}⭐) x{count}" for (name, stars), count in sorted(summary.items(), key=lambda x: (-x[0][1], x[0][0]))]
-            await interaction.response.edit_message(content=f"✨ 100 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {user_points[self.user_id]}", view=SummonView(self.user_id))
+            lines = summary_lines(results)
+            await interaction.response.edit_message(content=f"✨ 100 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {points}", view=SummonView(self.user_id))
 
     class SinglePullButton(discord.ui.Button):
         def __init__(self, user_id):
             super().__init__(label="Single Pull", style=discord.ButtonStyle.primary)
             self.user_id = user_id
         async def callback(self, interaction):
-            inventory = load_inventory()
-            user_points = load_points()
-            points = user_points.get(self.user_id, 0)
-            if points < SUMMON_COST:
+            results, points = await summon_units(self.user_id, 1)
+            if results is None:
                 await interaction.response.edit_message(content=f"❌ Not enough points! You need {SUMMON_COST} points to summon.", view=SummonView(self.user_id))
                 return
-            unit = get_random_unit()
-            user_points[self.user_id] = points - SUMMON_COST
-            save_points(user_points)
-            if self.user_id not in inventory:
-                inventory[self.user_id] = []
-            inventory[self.user_id].append(unit)
-            save_inventory(inventory)
-            await interaction.response.edit_message(content=f"✨ You summoned: {unit['name']} ({unit['stars']}⭐)!\n💰 Points left: {user_points[self.user_id]}", view=SummonView(self.user_id))
+            unit = pull_order(results)[0]
+            await interaction.response.edit_message(content=f"✨ You summoned: {unit.name} ({unit.stars}⭐)!\n💰 Points left: {points}", view=SummonView(self.user_id))
 
     class TenPullButton(discord.ui.Button):
         def __init__(self, user_id):
             super().__init__(label="10 Pull", style=discord.ButtonStyle.success)
             self.user_id = user_id
         async def callback(self, interaction):
-            inventory = load_inventory()
-            user_points = load_points()
-            points = user_points.get(self.user_id, 0)
             total_cost = SUMMON_COST * 10
-            if points < total_cost:
+            results, points = await summon_units(self.user_id, 10)
+            if results is None:
                 await interaction.response.edit_message(content=f"❌ Not enough points! You need {total_cost} points for 10 pulls.", view=SummonView(self.user_id))
                 return
-            results = []
-            for _ in range(10):
-                unit = get_random_unit()
-                results.append(unit)
-                if self.user_id not in inventory:
-                    inventory[self.user_id] = []
-                inventory[self.user_id].append(unit)
-            user_points[self.user_id] = points - total_cost
-            save_points(user_points)
-            save_inventory(inventory)
-            lines = [f"{unit['name']} ({unit['stars']}⭐)" for unit in results]
-            await interaction.response.edit_message(content=f"✨ 10 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {user_points[self.user_id]}", view=SummonView(self.user_id))
+            lines = [f"{unit.name} ({unit.stars}⭐)" for unit in pull_order(results)]
+            await interaction.response.edit_message(content=f"✨ 10 Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {points}", view=SummonView(self.user_id))
 
     @client.tree.command(name="summon", description="Open the summon interface", guild=GUILD_ID)
     async def summon(interaction: discord.Interaction):
         user_id = str(interaction.user.id)
-        user_points = load_points()
-        points = user_points.get(user_id, 0)
+        points = economy.get_points(user_id)
         view = SummonView(user_id)
         await interaction.response.send_message(f"Summon Interface:\n💰 Your points: {points}", view=view, ephemeral=True)
 
+    @client.tree.command(name="mass_summon", description=f"Summon many units at once (up to {MAX_MASS_SUMMON})", guild=GUILD_ID)
+    @app_commands.describe(pulls=f"Number of pulls, {SUMMON_COST} points each")
+    async def mass_summon(interaction: discord.Interaction, pulls: app_commands.Range[int, 1, MAX_MASS_SUMMON]):
+        user_id = str(interaction.user.id)
+        results, points = await summon_units(user_id, pulls)
+        if results is None:
+            await interaction.response.send_message(f"❌ Not enough points! You need {SUMMON_COST * pulls} points for {pulls} pulls.", ephemeral=True)
+            return
+        lines = summary_lines(results)
+        await interaction.response.send_message(f"✨ {pulls} Pull Results:\n" + "\n".join(lines) + f"\n💰 Points left: {points}", ephemeral=True)
+
     @client.tree.command(name="inventory", description="Show your summoned units!", guild=GUILD_ID)
     async def inventory_cmd(interaction: discord.Interaction):
         user_id = str(interaction.user.id)
-        inventory = load_inventory()
-        units = inventory.get(user_id, [])
-        if not units:
+        lines = summary_lines(await async_storage.summary(user_id))
+        if not lines:
             await interaction.response.send_message("Your inventory is empty!", ephemeral=True)
             return
-        # Count each unit by name and stars
-        unit_counts = {}
-        for unit in units:
-            key = (unit['name'], unit['stars'])
-            unit_counts[key] = unit_counts.get(key, 0) + 1
-        lines = [f"{name} ({stars}⭐) x{count}" for (name, stars), count in sorted(unit_counts.items(), key=lambda x: (-x[0][1], x[0][0]))]
-        await interaction.response.send_message("Your units:\n" + "\n".join(lines), ephemeral=True)
+        def render(page):
+            return "Your units:\n" + "\n".join(lines[page * INVENTORY_PAGE_LINES:(page + 1) * INVENTORY_PAGE_LINES])
+        await send_pages(interaction, -(-len(lines) // INVENTORY_PAGE_LINES), render)
 
     @client.tree.command(name="unitinfo", description="Check info for a unit by name", guild=GUILD_ID)
+    @app_commands.autocomplete(name=unit_name_autocomplete)
     async def unitinfo(interaction: discord.Interaction, name: str):
         # Case-insensitive search for unit name
-        unit = next((u for u in UNIT_POOL if u["name"].lower() == name.lower()), None)
+        unit = next(iter(find_units(name)), None)
         if not unit:
             await interaction.response.send_message(f"❌ No unit found with name '{name}'.", ephemeral=True)
             return
-        embed = discord.Embed(title=f"{unit['name']} ({unit['stars']}⭐)", color=discord.Color.blue())
-        image_path = get_unit_image_path(unit)
-
-        if os.path.exists(image_path):
-            embed.set_image(url=f"attachment://{os.path.basename(image_path)}")
-        stats = unit["stats"]
-        stats_str = "\n".join([f"**{k}:** {v}" for k, v in stats.items()])
+        embed = discord.Embed(title=f"{unit.name} ({unit.stars}⭐)", color=discord.Color.blue())
+        file, image_url = image_assets.embed_image(unit.image)
+        if image_url:
+            embed.set_image(url=image_url)
+        stats_str = "\n".join([f"**{k}:** {v}" for k, v in zip(STATS, unit.stats)])
         embed.add_field(name="Stats", value=stats_str, inline=False)
-        embed.add_field(name="Ability", value=unit["ability"], inline=False)
+        embed.add_field(name="Ability", value=unit.ability, inline=False)
         # Add Spells field if present
-        spell_field = unit.get("spell")
-        if spell_field:
-            if isinstance(spell_field, list):
-                spells_str = "\n".join(spell_field)
-            else:
-                spells_str = spell_field
-            embed.add_field(name="Spells", value=spells_str, inline=False)
-        # If image exists, send as file
-        if os.path.exists(image_path):
-            file = discord.File(image_path, filename=os.path.basename(image_path))
+        if unit.spells:
+            embed.add_field(name="Spells", value="\n".join(unit.spells), inline=False)
+        embed.set_footer(text=f"Unit catalog v{unit_catalog.get_catalog().version}")
+        # Attach the image only when it has no uploaded URL yet
+        if file:
             await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
         else:
             await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @client.tree.command(name="gacha_rates", description="Show the summon odds for every unit", guild=GUILD_ID)
+    async def gacha_rates(interaction: discord.Interaction):
+        embed = discord.Embed(title="🎲 Summon Rates", color=discord.Color.purple())
+        odds = sorted(unit_odds(), key=lambda x: (-x[0].stars, x[0].name))
+        lines = [f"{unit.name} ({unit.stars}⭐) — {p * 100:.2f}%" for unit, p in odds]
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"{SUMMON_COST} points per summon")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -0,0 +1,123 @@
+import random
+import numpy as np
+from . import unit_catalog
+
+# Summon odds: each star tier's rate is split evenly between the units of that
+# tier. Any probability left over (rates summing below 1, or a tier with no
+# units) falls back to the 1-star tier, as the old cumulative walk did.
+STAR_RATES = [
+    (1, 0.35),  # 35% chance for 1-star
+    (2, 0.25),  # 25% for 2-star
+    (3, 0.20),  # 20% for 3-star
+    (4, 0.12),  # 12% for 4-star
+    (5, 0.07),  # 7% for 5-star
+    (6, 0.01),  # 1% for 6-star
+]
+FALLBACK_STARS = 1
+NUMPY_MIN_PULLS = 50  # Below this a plain alias loop is faster than a NumPy call
+
+
+class AliasSampler:
+    """Walker's alias method: O(1) draws from a fixed discrete distribution."""
+    __slots__ = ("items", "odds", "prob", "alias", "_np_odds")
+
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("AliasSampler needs at least one item with positive weight")
+        self.items = list(items)
+        self.odds = [w / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        # Vose's construction: pair each under-full column with an over-full one
+        scaled = [p * n for p in self.odds]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is full up to float rounding
+        for i in small + large:
+            self.prob[i] = 1.0
+        self._np_odds = None
+
+    def draw(self, rng=random):
+        u = rng.random() * len(self.prob)
+        i = int(u)
+        return self.items[i if u - i < self.prob[i] else self.alias[i]]
+
+    def counts(self, n, rng=random):
+        """Draw `n` items at once, returning one count per item (same order as items)."""
+        if n >= NUMPY_MIN_PULLS:
+            if self._np_odds is None:
+                odds = np.asarray(self.odds, dtype=float)
+                self._np_odds = odds / odds.sum()
+            return np.random.default_rng(rng.getrandbits(64)).multinomial(n, self._np_odds).tolist()
+        counts = [0] * len(self.prob)
+        size = len(self.prob)
+        prob, alias, draw = self.prob, self.alias, rng.random
+        for _ in range(n):
+            u = draw() * size
+            i = int(u)
+            counts[i if u - i < prob[i] else alias[i]] += 1
+        return counts
+
+
+def unit_weights(pool, rates):
+    """Flatten star rates into one probability per unit of `pool`."""
+    tiers = {}
+    for unit in pool:
+        tiers.setdefault(unit.stars, []).append(unit)
+    weights = [0.0] * len(pool)
+    index = {id(unit): i for i, unit in enumerate(pool)}
+    for stars, rate in rates:
+        members = tiers.get(stars)
+        if not members:
+            continue  # Its mass goes to the fallback tier below
+        for unit in members:
+            weights[index[id(unit)]] += rate / len(members)
+    fallback = tiers.get(FALLBACK_STARS) or pool
+    missing = 1.0 - sum(weights)
+    if missing > 1e-12:
+        for unit in fallback:
+            weights[index[id(unit)]] += missing / len(fallback)
+    return weights
+
+
+_sampler = None
+_sampler_catalog = None
+_sampler_rates = None
+
+
+def get_sampler():
+    """The sampler for the current pool and rates, rebuilt when either changes."""
+    global _sampler, _sampler_catalog, _sampler_rates
+    catalog = unit_catalog.get_catalog()
+    rates = tuple(STAR_RATES)
+    # A catalog reload swaps in a new Catalog object. Compare the object itself:
+    # id() of a collected catalog can be reused by the next one.
+    if catalog is not _sampler_catalog or rates != _sampler_rates:
+        _sampler = AliasSampler(catalog.units, unit_weights(catalog.units, STAR_RATES))
+        _sampler_catalog = catalog
+        _sampler_rates = rates
+    return _sampler
+
+
+def get_random_unit():
+    return get_sampler().draw()
+
+
+def summon_counts(pulls):
+    """{unit_id: count} for `pulls` summons drawn in one batch (only units that came up)."""
+    sampler = get_sampler()
+    return {unit.id: count for unit, count in zip(sampler.items, sampler.counts(pulls)) if count}
+
+
+def unit_odds():
+    """(unit, probability) for every unit in the pool, in catalog order."""
+    sampler = get_sampler()
+    return list(zip(sampler.items, sampler.odds))
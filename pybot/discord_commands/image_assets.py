@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+import discord
+from . import async_storage, image_variants, storage
+
+# Unit images are uploaded once to an asset channel, and embeds then point at
+# the attachment's CDN URL instead of re-uploading the PNG with every message
+# (a battle used to send both unit images again on every Attack click).
+# Until an image has a URL, or when its URL is too old, embeds fall back to
+# attaching the file and an upload is started in the background. Without
+# ASSET_CHANNEL_ID set, images are always attached as before.
+ASSET_CHANNEL_ID = os.getenv("ASSET_CHANNEL_ID")
+BASE_DIR = os.path.dirname(__file__)
+URL_TTL = 20 * 3600  # Discord CDN links expire after ~24h; re-upload before that
+RETRY_DELAY = 300  # Seconds to wait before retrying a failed upload
+
+_client = None
+_assets = {}  # {relative path: (url, file mtime, uploaded_at)}
+_uploading = set()
+_failed = {}  # {relative path: time of the last failed upload}
+
+
+def setup(client):
+    """Remember the client and load the URLs uploaded by earlier runs."""
+    global _client
+    _client = client
+    _assets.update(storage.load_image_assets())
+
+
+def embed_image(rel_path, variant="card"):
+    """(file, url) for an image in an embed: no file when a fresh CDN URL is cached.
+
+    Otherwise returns a discord.File to attach, with its attachment:// URL.
+    `variant` picks the pre-sized copy to show ("thumb" or "card"). Returns
+    (None, None) if the image file doesn't exist.
+    """
+    rel_path = image_variants.variant_path(rel_path, variant)
+    path = os.path.join(BASE_DIR, rel_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None, None
+    cached = _assets.get(rel_path)
+    # A replaced image file gets a new upload
+    if cached and cached[1] == mtime and time.time() - cached[2] < URL_TTL:
+        return None, cached[0]
+    _start_upload(rel_path, path, mtime)
+    filename = os.path.basename(path)
+    return discord.File(path, filename=filename), f"attachment://{filename}"
+
+
+def _start_upload(rel_path, path, mtime):
+    if not ASSET_CHANNEL_ID or _client is None or rel_path in _uploading:
+        return
+    if time.time() - _failed.get(rel_path, 0) < RETRY_DELAY:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _uploading.add(rel_path)
+    loop.create_task(_upload(rel_path, path, mtime))
+
+
+async def _upload(rel_path, path, mtime):
+    try:
+        channel_id = int(ASSET_CHANNEL_ID)
+        channel = _client.get_channel(channel_id) or await _client.fetch_channel(channel_id)
+        message = await channel.send(file=discord.File(path, filename=os.path.basename(path)))
+        url = message.attachments[0].url
+        uploaded_at = time.time()
+        _assets[rel_path] = (url, mtime, uploaded_at)
+        _failed.pop(rel_path, None)
+        await async_storage.run_io(storage.save_image_asset, rel_path, url, mtime, uploaded_at)
+    except Exception as e:
+        _failed[rel_path] = time.time()
+        print(f"[assets] Could not upload {rel_path}: {e}")
+    finally:
+        _uploading.discard(rel_path)
@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+from . import unit_catalog
+
+try:
+    from PIL import Image
+except ImportError as e:  # Declared in requirements.txt; without it embeds fall back to the original images
+    Image = None
+    _import_error = e
+
+# Smaller, compressed copies of the unit images, sized for where embeds show
+# them: a battle thumbnail is drawn at ~80px, an embed image at ~400px, but
+# both used to ship the full PNG. Variants are built once (at startup, and
+# again when the catalog changes) into images/variants/, named after a hash of
+# the source bytes and the size, so an edited image gets fresh files (and a
+# fresh upload in image_assets) while unchanged ones are reused across runs.
+BASE_DIR = os.path.dirname(__file__)
+VARIANT_DIR = os.path.join("images", "variants")  # Relative to BASE_DIR, like unit.image
+VARIANTS = {
+    "thumb": 80,  # Longest edge in pixels
+    "card": 400,
+}
+WEBP_QUALITY = 85
+
+_build_lock = threading.Lock()  # Held while building, so builds never overlap
+_state_lock = threading.Lock()  # Guards _built_for and _building
+_variants = {}  # {(image path, variant name): variant path}
+_built_for = None  # The Catalog object the variants were built for
+_building = False
+
+
+def _build_one(rel_path, name, edge):
+    src = os.path.join(BASE_DIR, rel_path)
+    with open(src, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data + f":{edge}:{WEBP_QUALITY}".encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(rel_path))[0]
+    out = os.path.join(VARIANT_DIR, f"{stem}.{name}.{digest}.webp")
+    out_path = os.path.join(BASE_DIR, out)
+    if not os.path.exists(out_path):
+        with Image.open(src) as im:
+            im.thumbnail((edge, edge), Image.LANCZOS)  # Never upscales
+            tmp_path = out_path + ".tmp"
+            im.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=6)
+        os.replace(tmp_path, out_path)
+    # Keep the original when it is already the smaller file
+    return out if os.path.getsize(out_path) < len(data) else rel_path
+
+
+def build_variants():
+    """Make sure every catalog image has its variants on disk; cheap when they already exist."""
+    global _built_for
+    catalog = unit_catalog.get_catalog()
+    if Image is None:
+        with _state_lock:
+            if _built_for is None:
+                print(f"WARNING: Pillow is not installed ({_import_error}); unit image variants are DISABLED "
+                      "and embeds will use the full-size images. Run: pip install -r requirements.txt")
+            _built_for = catalog
+        return
+    with _build_lock:
+        # Compare the catalog object itself: id() of a collected one can be reused
+        if _built_for is catalog:
+            return
+        os.makedirs(os.path.join(BASE_DIR, VARIANT_DIR), exist_ok=True)
+        built = {}
+        for rel_path in sorted({u.image for u in catalog.units if u.image}):
+            for name, edge in VARIANTS.items():
+                try:
+                    built[(rel_path, name)] = _build_one(rel_path, name, edge)
+                except (OSError, ValueError) as e:
+                    print(f"[images] Could not build {name} variant of {rel_path}: {e}")
+        _variants.update(built)
+        with _state_lock:
+            _built_for = catalog
+    print(f"Unit image variants ready ({len(built)} files)")
+
+
+def _rebuild():
+    global _building
+    try:
+        build_variants()
+    finally:
+        with _state_lock:
+            _building = False
+
+
+def variant_path(rel_path, name):
+    """Path of the `name` variant of an image, or the image itself if there isn't one yet."""
+    global _building
+    catalog = unit_catalog.get_catalog()
+    with _state_lock:
+        # A reloaded catalog may bring new images; build them off the event loop
+        start = _built_for is not catalog and not _building
+        if start:
+            _building = True
+    if start:
+        threading.Thread(target=_rebuild, daemon=True).start()
+    return _variants.get((rel_path, name), rel_path)
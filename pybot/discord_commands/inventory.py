@@ -0,0 +1,214 @@
+import json
+import threading
+from . import storage
+
+# Write-back cache of gacha inventories, sharded per user. A user's record is
+# loaded the first time it is needed; mutations mark only that user dirty and
+# the storage flush thread persists just the dirty users' records.
+#
+# Inventories are stored compactly: each entry is a catalog unit id plus the
+# per-instance stat deltas, and identical copies share one stack with a count.
+# Names, images, abilities and base stats are resolved from unit_catalog on read.
+STATS = ("HP", "ATK", "DEF")
+NO_DELTA = (0, 0, 0)
+
+_lock = threading.Lock()
+_cache = {}
+_summaries = {}  # user_id -> {unit_id: copies}, kept in step with _cache
+_dirty = set()
+_all_loaded = False
+
+
+class UnitStack:
+    """`count` interchangeable copies of catalog unit `unit_id` with the same stat deltas."""
+    __slots__ = ("unit_id", "count", "delta")
+
+    def __init__(self, unit_id, count=1, delta=NO_DELTA):
+        self.unit_id = unit_id
+        self.count = count
+        self.delta = tuple(delta)
+
+    def copy(self):
+        return UnitStack(self.unit_id, self.count, self.delta)
+
+    def to_record(self):
+        if self.delta == NO_DELTA:
+            return [self.unit_id, self.count]
+        return [self.unit_id, self.count, list(self.delta)]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record[0], record[1], record[2] if len(record) > 2 else NO_DELTA)
+
+
+def normalize(stacks):
+    """Merge stacks with the same unit and deltas, keeping first-appearance order."""
+    merged = {}
+    for stack in stacks:
+        if stack.count <= 0:
+            continue
+        key = (stack.unit_id, stack.delta)
+        if key in merged:
+            merged[key].count += stack.count
+        else:
+            merged[key] = stack.copy()
+    return list(merged.values())
+
+
+def _count(stacks):
+    counts = {}
+    for stack in stacks:
+        counts[stack.unit_id] = counts.get(stack.unit_id, 0) + stack.count
+    return counts
+
+
+def _store(user_id, stacks):
+    _cache[user_id] = stacks
+    _summaries[user_id] = _count(stacks)
+    return stacks
+
+
+def _get(user_id):
+    stacks = _cache.get(user_id)
+    if stacks is None:
+        stacks = _store(user_id, [UnitStack.from_record(r) for r in storage.load_user_inventory(user_id)])
+    return stacks
+
+
+def is_loaded(user_id):
+    return str(user_id) in _cache
+
+
+def preload(user_id):
+    """Load the user's record from storage (blocking; async callers use async_storage)."""
+    user_id = str(user_id)
+    if user_id in _cache:
+        return
+    # Read outside the lock so the event loop never waits on this disk access
+    stacks = [UnitStack.from_record(r) for r in storage.load_user_inventory(user_id)]
+    with _lock:
+        if user_id not in _cache:
+            _store(user_id, stacks)
+
+
+def get_units(user_id):
+    """Return a copy of the user's stacks; write changes back with set_units()."""
+    user_id = str(user_id)
+    with _lock:
+        return [stack.copy() for stack in _get(user_id)]
+
+
+def summary(user_id):
+    """{unit_id: copies} for the user, maintained incrementally (no walk over stacks)."""
+    user_id = str(user_id)
+    with _lock:
+        _get(user_id)
+        return dict(_summaries[user_id])
+
+
+def owned_unit_ids(user_id):
+    """Set of catalog ids the user holds at least one copy of."""
+    user_id = str(user_id)
+    with _lock:
+        _get(user_id)
+        return set(_summaries[user_id])
+
+
+def add_units(user_id, unit_ids):
+    """Add one fresh (unbuffed) copy per catalog id in `unit_ids`."""
+    counts = {}
+    for unit_id in unit_ids:
+        counts[unit_id] = counts.get(unit_id, 0) + 1
+    add_unit_counts(user_id, counts)
+
+
+def add_unit_counts(user_id, counts):
+    """Add `count` fresh copies for each {unit_id: count}, as one change to the record."""
+    user_id = str(user_id)
+    with _lock:
+        stacks = _get(user_id)
+        totals = _summaries[user_id]
+        plain = {stack.unit_id: stack for stack in stacks if stack.delta == NO_DELTA}
+        for unit_id, count in counts.items():
+            if unit_id in plain:
+                plain[unit_id].count += count
+            else:
+                stacks.append(UnitStack(unit_id, count))
+            totals[unit_id] = totals.get(unit_id, 0) + count
+        _dirty.add(user_id)
+
+
+def set_units(user_id, stacks, counts=None):
+    """Replace the user's stacks.
+
+    `counts` gives the new {unit_id: copies} of every unit whose total changed,
+    and only those summary entries are updated; without it the summary is
+    recounted from `stacks`.
+    """
+    user_id = str(user_id)
+    with _lock:
+        if counts is None:
+            _store(user_id, normalize(stacks))
+        else:
+            _get(user_id)
+            _cache[user_id] = normalize(stacks)
+            totals = _summaries[user_id]
+            for unit_id, count in counts.items():
+                if count > 0:
+                    totals[unit_id] = count
+                else:
+                    totals.pop(unit_id, None)
+        _dirty.add(user_id)
+
+
+def set_delta(user_id, unit_id, old_delta, new_delta):
+    """Move one copy of `unit_id` from the stack with `old_delta` to one with `new_delta`."""
+    user_id = str(user_id)
+    with _lock:
+        stacks = _get(user_id)
+        for i, stack in enumerate(stacks):
+            if stack.unit_id == unit_id and stack.delta == tuple(old_delta):
+                stack.count -= 1
+                stacks.insert(i, UnitStack(unit_id, 1, new_delta))
+                # Copies only move between stacks, so the summary is unchanged
+                _cache[user_id] = normalize(stacks)
+                _dirty.add(user_id)
+                return True
+    return False
+
+
+def _load_all():
+    global _all_loaded
+    loaded = None if _all_loaded else storage.load_inventory()
+    if loaded is not None:
+        with _lock:
+            for user_id, records in loaded.items():
+                if user_id not in _cache:
+                    _store(user_id, [UnitStack.from_record(r) for r in records])
+            _all_loaded = True
+
+
+def users_with_units():
+    """Ids of every user holding at least one unit."""
+    _load_all()
+    with _lock:
+        return [user_id for user_id, counts in _summaries.items() if counts]
+
+
+def flush():
+    with _lock:
+        if not _dirty:
+            return
+        # Serialize under the lock so a concurrent mutation can't tear a record
+        records = {user_id: json.dumps([s.to_record() for s in _cache[user_id]]) if _cache.get(user_id) else None
+                   for user_id in _dirty}
+        _dirty.clear()
+    try:
+        storage.save_user_inventories(records)
+    except Exception:
+        with _lock:
+            _dirty.update(records)
+        raise
+
+
+storage.register_flush(flush)
@@ -0,0 +1,70 @@
+import threading
+
+from sortedcontainers import SortedList
+
+# Ranking of users by (prestige, points), kept sorted as balances change so the
+# leaderboard panel never has to sort every user per click. economy reports
+# point changes and prestige_commands reports prestige changes; only users with
+# a points balance are ranked, matching the old sort over user_points.
+#
+# Entries are (-prestige, -points, user_id) tuples in ascending order, so the
+# best user is first. SortedList keeps them in a tree of short sublists, so a
+# balance change (remove + add) and a rank lookup are both O(log n).
+_lock = threading.Lock()
+_points = {}
+_prestige = {}
+_ranked = SortedList()
+
+
+def _key(user_id):
+    return (-_prestige.get(user_id, 0), -_points[user_id], user_id)
+
+
+def _remove(user_id):
+    if user_id in _points:
+        _ranked.remove(_key(user_id))
+
+
+def load(points=None, prestige=None):
+    """Bulk-load balances and/or prestige levels, sorting once."""
+    global _ranked
+    with _lock:
+        if points:
+            _points.update(points)
+        if prestige:
+            _prestige.update(prestige)
+        _ranked = SortedList(_key(user_id) for user_id in _points)
+
+
+def set_points(user_id, points):
+    user_id = str(user_id)
+    with _lock:
+        _remove(user_id)
+        _points[user_id] = points
+        _ranked.add(_key(user_id))
+
+
+def set_prestige(user_id, level):
+    user_id = str(user_id)
+    with _lock:
+        ranked = user_id in _points
+        if ranked:
+            _remove(user_id)
+        _prestige[user_id] = level
+        if ranked:
+            _ranked.add(_key(user_id))
+
+
+def top(n=10):
+    """Return the best `n` users as (user_id, points, prestige) tuples."""
+    with _lock:
+        return [(user_id, -points, -prestige) for prestige, points, user_id in _ranked.islice(0, n)]
+
+
+def rank(user_id):
+    """Return (rank, points, prestige) for a ranked user, or None."""
+    user_id = str(user_id)
+    with _lock:
+        if user_id not in _points:
+            return None
+        return _ranked.bisect_left(_key(user_id)) + 1, _points[user_id], _prestige.get(user_id, 0)
@@ -0,0 +1,50 @@
+import random
+import numpy as np
+from .inventory import STATS, UnitStack
+from .unit_catalog import get_unit
+
+# Duplicate merging for /buff_unit, /buff_all_units and auto-merge on summon.
+# Every consumed copy adds the unit's star count to one random stat of the
+# kept copy; the stat picks for a whole group are drawn together.
+
+
+def split_copies(copies_per_group, rng=random):
+    """For each group's consumed-copy count, split it uniformly at random across STATS."""
+    if not copies_per_group:
+        return []
+    gen = np.random.default_rng(rng.getrandbits(64))
+    return gen.multinomial(copies_per_group, [1 / len(STATS)] * len(STATS)).tolist()
+
+
+def merge_duplicates(stacks, unit_ids=None):
+    """Combine every unit with 2+ copies (optionally only `unit_ids`) into its first copy.
+
+    Returns the new stack list, one summary line per merged unit and the new
+    {unit_id: copies} of the merged units (always 1), for inventory.set_units.
+    """
+    totals = {}
+    first = {}
+    for i, stack in enumerate(stacks):
+        if unit_ids is None or stack.unit_id in unit_ids:
+            totals[stack.unit_id] = totals.get(stack.unit_id, 0) + stack.count
+            first.setdefault(stack.unit_id, i)
+    groups = [unit_id for unit_id, total in totals.items() if total >= 2]
+    if not groups:
+        return stacks, [], {}
+    splits = dict(zip(groups, split_copies([totals[unit_id] - 1 for unit_id in groups])))
+    merged = []
+    messages = []
+    for i, stack in enumerate(stacks):
+        split = splits.get(stack.unit_id)
+        if split is None:
+            merged.append(stack)
+            continue
+        if first[stack.unit_id] != i:
+            continue  # Consumed into the first copy
+        unit = get_unit(stack.unit_id)
+        stars = unit.stars
+        increases = [n * stars for n in split]
+        merged.append(UnitStack(stack.unit_id, 1, [d + inc for d, inc in zip(stack.delta, increases)]))
+        buff_msgs = [f"{stat} +{inc}" for stat, inc in zip(STATS, increases) if inc > 0]
+        messages.append(f"{unit.name} ({stars}⭐): {'; '.join(buff_msgs)} (combined {totals[stack.unit_id]} copies)")
+    return merged, messages, {unit_id: 1 for unit_id in groups}
@@ -1,59 +1,38 @@
-import os
-import json
+import threading
 import discord
-from discord import app_commands
+from . import async_storage, economy, inventory, leaderboard, storage
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-POINTS_FILE = os.path.join(DATA_DIR, "points_data.json")
-INVENTORY_FILE = os.path.join(DATA_DIR, "gacha_inventory.json")
-def get_prestige_file():
-    return os.path.join(os.path.dirname(__file__), "data/prestige_data.json")
-def load_prestige():
-    prestige_file = get_prestige_file()
-    if os.path.exists(prestige_file):
-        with open(prestige_file, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-def save_prestige(prestige):
-    prestige_file = get_prestige_file()
-    with open(prestige_file, "w") as f:
-        json.dump(prestige, f)
+# Prestige levels are read on every farm/slot/jackpot click, so keep them in
+# memory: loaded once from storage, written through by set_user_prestige.
+_prestige = {}
+_prestige_lock = threading.Lock()
+_prestige_loaded = False
+
+def load_prestige_index():
+    global _prestige_loaded
+    if _prestige_loaded:
+        return
+    levels = storage.load_prestige()
+    with _prestige_lock:
+        if not _prestige_loaded:
+            _prestige.update(levels)
+            leaderboard.load(prestige=levels)
+            _prestige_loaded = True
+def _ensure_loaded():
+    if not _prestige_loaded:
+        load_prestige_index()
 def get_user_prestige(user_id):
-    prestige = load_prestige()
-    return prestige.get(str(user_id), 0)
+    _ensure_loaded()
+    return _prestige.get(str(user_id), 0)
 def set_user_prestige(user_id, value):
-    prestige = load_prestige()
-    prestige[str(user_id)] = value
-    save_prestige(prestige)
+    _ensure_loaded()
+    with _prestige_lock:
+        _prestige[str(user_id)] = value
+    leaderboard.set_prestige(user_id, value)
+    storage.set_prestige(user_id, value)
 def get_point_multiplier(user_id):
     prestige = get_user_prestige(user_id)
     return 1 + prestige * 0.1  # 10% more points per prestige level
-def load_points():
-    if os.path.exists(POINTS_FILE):
-        with open(POINTS_FILE, "r") as f:
-            data = json.load(f)
-            return data.get("user_points", {})
-    return {}
-def save_points(user_points):
-    if os.path.exists(POINTS_FILE):
-        with open(POINTS_FILE, "r") as f:
-            data = json.load(f)
-    else:
-        data = {}
-    data["user_points"] = user_points
-    with open(POINTS_FILE, "w") as f:
-        json.dump(data, f)
-def load_inventory():
-    if os.path.exists(INVENTORY_FILE):
-        with open(INVENTORY_FILE, "r") as f:
-            return json.load(f)
-    return {}
-def save_inventory(inventory):
-    with open(INVENTORY_FILE, "w") as f:
-        json.dump(inventory, f)
 def register_prestige_commands(client, GUILD_ID):
     class PrestigeConfirmView(discord.ui.View):
         def __init__(self, user_id, cost_points, cost_units, next_level, bonus):
@@ -74,19 +53,18 @@ def register_prestige_commands(client, GUILD_ID):
             if user_id != self.parent_view.user_id:
                 await interaction.response.send_message("This button is not for you!", ephemeral=True)
                 return
-            user_points = load_points()
-            inventory = load_inventory()
-            points = user_points.get(user_id, 0)
-            # Check cost again in case user changed points
-            if points < self.parent_view.cost_points:
+            async with async_storage.user_lock(user_id):
+                points = economy.get_points(user_id)
+                # Check cost again in case user changed points
+                can_prestige = points >= self.parent_view.cost_points
+                if can_prestige:
+                    # Sacrifice required points and delete all units
+                    economy.add_points(user_id, -self.parent_view.cost_points, "prestige")
+                    inventory.set_units(user_id, [])
+                    await async_storage.run_io(set_user_prestige, user_id, self.parent_view.next_level)
+            if not can_prestige:
                 await interaction.response.send_message("❌ You no longer meet the prestige cost!", ephemeral=True)
                 return
-            # Sacrifice required points and delete all units
-            user_points[user_id] = points - self.parent_view.cost_points
-            inventory[user_id] = []
-            save_points(user_points)
-            save_inventory(inventory)
-            set_user_prestige(user_id, self.parent_view.next_level)
             await interaction.response.edit_message(
                 content=(f"🏆 You have prestiged! Prestige Level: {self.parent_view.next_level}\n"
                          f"You now earn {int(self.parent_view.bonus*100)}% points from all sources."),
@@ -95,12 +73,8 @@ def register_prestige_commands(client, GUILD_ID):
     async def prestige(interaction: discord.Interaction):
         user_id = str(interaction.user.id)
         prestige = get_user_prestige(user_id)
-        user_points = load_points()
-        inventory = load_inventory()
-        units = inventory.get(user_id, [])
-        points = user_points.get(user_id, 0)
+        points = economy.get_points(user_id)
         next_prestige = prestige + 1
-        bonus = get_point_multiplier(user_id)
         # Cost: fixed by prestige level
         cost_points = 10000 + (10000 * prestige * 0.10)
         cost_units = 0  # No unit requirement
@@ -0,0 +1,421 @@
+import os
+import json
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DB_FILE = os.path.join(DATA_DIR, "game_state.db")
+
+# Legacy JSON files, imported once when the database is first created
+POINTS_FILE = os.path.join(DATA_DIR, "points_data.json")
+INVENTORY_FILE = os.path.join(DATA_DIR, "gacha_inventory.json")
+PRESTIGE_FILE = os.path.join(DATA_DIR, "prestige_data.json")
+ACTIVE_UNITS_FILE = os.path.join(DATA_DIR, "active_units.json")
+BOSS_FILE = os.path.join(DATA_DIR, "boss_data.json")
+
+FLUSH_INTERVAL = 2.0  # Seconds between background flushes of in-memory caches
+BANK_ACCOUNT = "__bot_bank__"  # Ledger account used for bot bank changes
+
+_conn = None
+_lock = threading.RLock()
+_flush_hooks = []
+_flush_stop = threading.Event()
+_flush_thread = None
+
+
+def _load_legacy_json(path, default):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return default
+    return default
+
+
+def _migrate_v1(conn):
+    # executescript() would commit the migration transaction, so run statements one by one
+    for statement in (
+        """CREATE TABLE IF NOT EXISTS points (
+            user_id TEXT PRIMARY KEY,
+            amount NUMERIC NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS bot_bank (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            amount NUMERIC NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS inventory_units (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS inventory_units_user ON inventory_units (user_id, id)",
+        """CREATE TABLE IF NOT EXISTS prestige (
+            user_id TEXT PRIMARY KEY,
+            level INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS active_units (
+            user_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            stars INTEGER NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS boss (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            data TEXT NOT NULL
+        )""",
+    ):
+        conn.execute(statement)
+    # Import whatever the bot had saved before the database existed
+    points_data = _load_legacy_json(POINTS_FILE, {})
+    conn.executemany(
+        "INSERT OR REPLACE INTO points (user_id, amount) VALUES (?, ?)",
+        [(str(uid), amount) for uid, amount in points_data.get("user_points", {}).items()])
+    conn.execute(
+        "INSERT OR REPLACE INTO bot_bank (id, amount) VALUES (0, ?)",
+        (points_data.get("bot_bank", {"amount": 0}).get("amount", 0),))
+    inventory = _load_legacy_json(INVENTORY_FILE, {})
+    for uid, units in inventory.items():
+        conn.executemany(
+            "INSERT INTO inventory_units (user_id, data) VALUES (?, ?)",
+            [(str(uid), json.dumps(unit)) for unit in units])
+    conn.executemany(
+        "INSERT OR REPLACE INTO prestige (user_id, level) VALUES (?, ?)",
+        [(str(uid), level) for uid, level in _load_legacy_json(PRESTIGE_FILE, {}).items()])
+    conn.executemany(
+        "INSERT OR REPLACE INTO active_units (user_id, name, stars) VALUES (?, ?, ?)",
+        [(str(uid), active["name"], active["stars"])
+         for uid, active in _load_legacy_json(ACTIVE_UNITS_FILE, {}).items()])
+    boss = _load_legacy_json(BOSS_FILE, None)
+    if boss:
+        conn.execute("INSERT OR REPLACE INTO boss (id, data) VALUES (0, ?)", (json.dumps(boss),))
+
+
+def _migrate_v2(conn):
+    # Append-only log of point changes; folded into the points/bot_bank snapshot by compact_ledger()
+    conn.execute("""CREATE TABLE IF NOT EXISTS points_ledger (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        delta NUMERIC NOT NULL,
+        reason TEXT NOT NULL,
+        ts REAL NOT NULL
+    )""")
+
+
+def _migrate_v3(conn):
+    # Inventories become one key-value record per user, so a write only touches that user
+    conn.execute("""CREATE TABLE IF NOT EXISTS inventories (
+        user_id TEXT PRIMARY KEY,
+        units TEXT NOT NULL
+    )""")
+    inventory = {}
+    for uid, data in conn.execute("SELECT user_id, data FROM inventory_units ORDER BY id"):
+        inventory.setdefault(uid, []).append(json.loads(data))
+    conn.executemany(
+        "INSERT OR REPLACE INTO inventories (user_id, units) VALUES (?, ?)",
+        [(uid, json.dumps(units)) for uid, units in inventory.items()])
+    conn.execute("DROP TABLE inventory_units")
+
+
+# The units as they were at schema v4: (name, stars) -> (unit_id, base HP/ATK/DEF).
+# Frozen here rather than read from the live catalog, which can change or lose
+# units after this migration was written.
+_V4_UNITS = {
+    ("slime", 1): ("slime", (50, 10, 5)),
+    ("goblin", 2): ("goblin", (80, 20, 10)),
+    ("knight", 3): ("knight", (120, 35, 25)),
+    ("mage", 4): ("mage", (90, 50, 10)),
+    ("dragon", 5): ("dragon", (200, 80, 40)),
+    ("michael saves", 6): ("michael_saves", (250, 100, 60)),
+    ("shrek", 4): ("shrek", (160, 45, 35)),
+    ("amongus", 2): ("amongus", (70, 18, 12)),
+    ("elon musk", 5): ("elon_musk", (180, 65, 30)),
+}
+
+
+def _migrate_v4(conn):
+    # Inventory records switch from full unit dicts to compact [unit_id, count, delta] stacks.
+    # The record format is written out here too, not taken from inventory.py
+    updates = []
+    for uid, units in conn.execute("SELECT user_id, units FROM inventories").fetchall():
+        stacks = {}  # (unit_id, delta) -> copies, in first-appearance order
+        for unit in json.loads(units):
+            known = _V4_UNITS.get((str(unit.get("name", "")).lower(), unit.get("stars")))
+            if known is None:
+                # Abort (the migration rolls back) rather than lose the unit for good
+                raise ValueError(f"Unknown unit in {uid}'s inventory: {unit.get('name')} ({unit.get('stars')}⭐); "
+                                 "add it to _V4_UNITS and restart")
+            unit_id, base_stats = known
+            delta = tuple(unit["stats"].get(stat, base) - base for stat, base in zip(("HP", "ATK", "DEF"), base_stats))
+            stacks[unit_id, delta] = stacks.get((unit_id, delta), 0) + 1
+        records = [[unit_id, count, list(delta)] if any(delta) else [unit_id, count]
+                   for (unit_id, delta), count in stacks.items()]
+        updates.append((json.dumps(records), uid))
+    conn.executemany("UPDATE inventories SET units = ? WHERE user_id = ?", updates)
+
+
+def _migrate_v5(conn):
+    # Per-user preferences, one JSON value per (user, setting name)
+    conn.execute("""CREATE TABLE IF NOT EXISTS user_settings (
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (user_id, name)
+    )""")
+
+
+def _migrate_v6(conn):
+    # CDN URLs of images already uploaded to the asset channel, keyed by file path
+    conn.execute("""CREATE TABLE IF NOT EXISTS image_assets (
+        path TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        mtime REAL NOT NULL,
+        uploaded_at REAL NOT NULL
+    )""")
+
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6]
+
+
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        print(f"Game state database migrated to schema v{target}")
+
+
+def get_connection():
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _migrate(conn)
+            _conn = conn
+        return _conn
+
+
+@contextmanager
+def transaction():
+    """Group several writes into one commit; nested uses join the outer transaction."""
+    conn = get_connection()
+    with _lock:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def _fetchone(sql, params=()):
+    with _lock:
+        return get_connection().execute(sql, params).fetchone()
+
+
+def _fetchall(sql, params=()):
+    with _lock:
+        return get_connection().execute(sql, params).fetchall()
+
+
+# --- Background flushing for write-back caches ---
+def register_flush(hook):
+    if hook not in _flush_hooks:
+        _flush_hooks.append(hook)
+
+
+def flush_all():
+    for hook in list(_flush_hooks):
+        try:
+            hook()
+        except Exception as e:
+            print(f"Error flushing game state: {e}")
+
+
+def _flush_loop(interval):
+    while not _flush_stop.wait(interval):
+        flush_all()
+
+
+def start_background_flush(interval=FLUSH_INTERVAL):
+    global _flush_thread
+    if _flush_thread is not None:
+        return
+    _flush_stop.clear()
+    _flush_thread = threading.Thread(target=_flush_loop, args=(interval,), name="storage-flush", daemon=True)
+    _flush_thread.start()
+    atexit.register(stop_background_flush)
+
+
+def stop_background_flush():
+    """Stop the flush thread and write out anything still pending (safe to call twice)."""
+    global _flush_thread
+    _flush_stop.set()
+    if _flush_thread is not None:
+        _flush_thread.join()
+        _flush_thread = None
+    flush_all()
+
+
+# --- Points and bot bank (snapshot tables plus the ledger tail) ---
+def load_points():
+    return {uid: amount for uid, amount in _fetchall("SELECT user_id, amount FROM points")}
+
+
+def get_bot_bank():
+    row = _fetchone("SELECT amount FROM bot_bank WHERE id = 0")
+    return row[0] if row else 0
+
+
+def load_ledger():
+    """Ledger entries not yet compacted into the snapshot, oldest first."""
+    return _fetchall("SELECT user_id, delta, reason, ts FROM points_ledger ORDER BY seq")
+
+
+def append_ledger(entries):
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO points_ledger (user_id, delta, reason, ts) VALUES (?, ?, ?, ?)", entries)
+
+
+def compact_ledger():
+    """Fold every ledger entry into the snapshot tables and drop them from the log."""
+    with transaction() as conn:
+        last_seq = conn.execute("SELECT MAX(seq) FROM points_ledger").fetchone()[0]
+        if last_seq is None:
+            return 0
+        totals = conn.execute(
+            "SELECT user_id, SUM(delta) FROM points_ledger WHERE seq <= ? GROUP BY user_id",
+            (last_seq,)).fetchall()
+        for user_id, delta in totals:
+            if user_id == BANK_ACCOUNT:
+                conn.execute(
+                    "INSERT INTO bot_bank (id, amount) VALUES (0, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET amount = amount + excluded.amount",
+                    (delta,))
+            else:
+                conn.execute(
+                    "INSERT INTO points (user_id, amount) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET amount = amount + excluded.amount",
+                    (user_id, delta))
+        removed = conn.execute("DELETE FROM points_ledger WHERE seq <= ?", (last_seq,)).rowcount
+    return removed
+
+
+# --- Gacha inventory (one record per user) ---
+def load_user_inventory(user_id):
+    row = _fetchone("SELECT units FROM inventories WHERE user_id = ?", (str(user_id),))
+    return json.loads(row[0]) if row else []
+
+
+def save_user_inventories(records):
+    """Persist pre-serialized {user_id: units_json} records; None deletes the user's record."""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO inventories (user_id, units) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET units = excluded.units",
+            [(uid, data) for uid, data in records.items() if data is not None])
+        conn.executemany(
+            "DELETE FROM inventories WHERE user_id = ?",
+            [(uid,) for uid, data in records.items() if data is None])
+
+
+def load_inventory():
+    return {uid: json.loads(data) for uid, data in _fetchall("SELECT user_id, units FROM inventories")}
+
+
+# --- Prestige ---
+def get_prestige(user_id):
+    row = _fetchone("SELECT level FROM prestige WHERE user_id = ?", (str(user_id),))
+    return row[0] if row else 0
+
+
+def set_prestige(user_id, level):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO prestige (user_id, level) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET level = excluded.level",
+            (str(user_id), level))
+
+
+def load_prestige():
+    return {uid: level for uid, level in _fetchall("SELECT user_id, level FROM prestige")}
+
+
+# --- User settings ---
+def get_user_setting(user_id, name, default=None):
+    row = _fetchone("SELECT value FROM user_settings WHERE user_id = ? AND name = ?", (str(user_id), name))
+    return json.loads(row[0]) if row else default
+
+
+def set_user_setting(user_id, name, value):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO user_settings (user_id, name, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id, name) DO UPDATE SET value = excluded.value",
+            (str(user_id), name, json.dumps(value)))
+
+
+# --- Uploaded image assets ---
+def load_image_assets():
+    return {path: (url, mtime, uploaded_at)
+            for path, url, mtime, uploaded_at in _fetchall("SELECT path, url, mtime, uploaded_at FROM image_assets")}
+
+
+def save_image_asset(path, url, mtime, uploaded_at):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO image_assets (path, url, mtime, uploaded_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET url = excluded.url, mtime = excluded.mtime, "
+            "uploaded_at = excluded.uploaded_at",
+            (path, url, mtime, uploaded_at))
+
+
+# --- Active battle units ---
+def get_active_unit(user_id):
+    row = _fetchone("SELECT name, stars FROM active_units WHERE user_id = ?", (str(user_id),))
+    return {"name": row[0], "stars": row[1]} if row else None
+
+
+def set_active_unit(user_id, name, stars):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO active_units (user_id, name, stars) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET name = excluded.name, stars = excluded.stars",
+            (str(user_id), name, stars))
+
+
+def load_active_units():
+    return {uid: {"name": name, "stars": stars}
+            for uid, name, stars in _fetchall("SELECT user_id, name, stars FROM active_units")}
+
+
+# --- World boss ---
+def load_boss_state():
+    row = _fetchone("SELECT data FROM boss WHERE id = 0")
+    return json.loads(row[0]) if row else None
+
+
+def save_boss_state(boss):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO boss (id, data) VALUES (0, ?)", (json.dumps(boss),))
+
+
+def clear_boss_state():
+    with transaction() as conn:
+        conn.execute("DELETE FROM boss WHERE id = 0")
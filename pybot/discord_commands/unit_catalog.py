@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from .inventory import STATS, NO_DELTA, UnitStack, normalize
+
+# Versioned unit catalog, loaded from data/units.json and shared by gacha,
+# battles and boss spawning. Inventories store only a unit id plus stat
+# deltas, so names, images, abilities, spells and base stats live here alone:
+# editing the file changes every owned copy at once, with no data rewrite.
+# The file is re-read when it changes on disk (checked every few seconds, off
+# the event loop).
+# Abilities and spells keep their display text but act through the effect ids
+# in "passives" and "spell_effects", which battles look up in their tables.
+# Never reuse or delete an id players may own; list it under "retired"
+# (old id -> replacement id) instead, and bump "version" on every edit.
+CATALOG_FILE = os.path.join(os.path.dirname(__file__), "data", "units.json")
+RELOAD_CHECK_INTERVAL = 5.0  # Seconds between checks for an edited catalog file
+
+
+@dataclass(frozen=True, slots=True)
+class UnitTemplate:
+    id: str
+    name: str
+    stars: int
+    image: str
+    stats: tuple  # Base stats in STATS order
+    ability: str
+    spell: object = None  # One spell string, a tuple of them, or None
+    passives: tuple = ()  # Passive effect ids behind the ability text
+    spell_effects: tuple = ()  # One effect id per entry of spells
+
+    @property
+    def spells(self):
+        if self.spell is None:
+            return ()
+        return self.spell if isinstance(self.spell, tuple) else (self.spell,)
+
+    def stat(self, name):
+        return self.stats[STATS.index(name)]
+
+    def to_dict(self, delta=NO_DELTA):
+        """A fresh unit dict (the shape battles and the boss use) with `delta` applied."""
+        unit = {
+            "id": self.id,
+            "name": self.name,
+            "stars": self.stars,
+            "image": self.image,
+            "stats": {stat: base + d for stat, base, d in zip(STATS, self.stats, delta)},
+            "ability": self.ability,
+        }
+        if self.spell is not None:
+            unit["spell"] = list(self.spell) if isinstance(self.spell, tuple) else self.spell
+        unit["passives"] = list(self.passives)
+        unit["spell_effects"] = list(self.spell_effects)
+        return unit
+
+    @classmethod
+    def from_dict(cls, data):
+        spell = data.get("spell")
+        unit = cls(
+            id=data["id"],
+            name=data["name"],
+            stars=data["stars"],
+            image=data.get("image", ""),
+            stats=tuple(data["stats"][stat] for stat in STATS),
+            ability=data.get("ability", ""),
+            spell=tuple(spell) if isinstance(spell, list) else spell,
+            passives=tuple(data.get("passives", ())),
+            spell_effects=tuple(data.get("spell_effects", ())),
+        )
+        if len(unit.spell_effects) != len(unit.spells):
+            raise ValueError(f"Unit {unit.id} needs one spell_effects entry per spell")
+        return unit
+
+
+class Catalog:
+    """One immutable catalog version, indexed by id and case-folded name."""
+    __slots__ = ("version", "units", "by_id", "by_name", "name_index")
+
+    def __init__(self, version, units, retired=None):
+        self.version = version
+        self.units = tuple(units)
+        self.by_id = {u.id: u for u in self.units}
+        if len(self.by_id) != len(self.units):
+            raise ValueError("Duplicate unit id in catalog")
+        # Copies of retired units resolve to their replacement
+        for old, new in (retired or {}).items():
+            self.by_id.setdefault(old, self.by_id[new])
+        by_name = {}
+        for u in self.units:
+            by_name.setdefault(u.name.casefold(), []).append(u)
+        self.by_name = {k: tuple(v) for k, v in by_name.items()}
+        # Sorted (key, position) pairs for prefix search; every word of a name is
+        # a key too, so "sav" finds "Michael Saves"
+        index = []
+        for pos, u in enumerate(self.units):
+            name = u.name.casefold()
+            for i, ch in enumerate(name):
+                if i == 0 or (name[i - 1] == " " and ch != " "):
+                    index.append((name[i:], pos))
+        self.name_index = sorted(index)
+
+    def complete(self, prefix, limit=25, unit_ids=None):
+        """Units whose name (or a word in it) starts with `prefix`, optionally only `unit_ids`."""
+        prefix = prefix.strip().casefold()
+        found = []
+        seen = set()
+        i = bisect_left(self.name_index, (prefix, -1))
+        while i < len(self.name_index) and len(found) < limit:
+            key, pos = self.name_index[i]
+            if not key.startswith(prefix):
+                break
+            unit = self.units[pos]
+            if pos not in seen and (unit_ids is None or unit.id in unit_ids):
+                seen.add(pos)
+                found.append(unit)
+            i += 1
+        return found
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("version", 0), [UnitTemplate.from_dict(u) for u in data["units"]], data.get("retired"))
+
+
+_lock = threading.Lock()
+_catalog = None
+_mtime = None
+_next_check = 0.0
+_checking = False
+
+
+def _load():
+    global _catalog, _mtime
+    try:
+        mtime = os.path.getmtime(CATALOG_FILE)
+    except OSError:
+        mtime = None
+    if _catalog is not None and mtime == _mtime:
+        return
+    try:
+        catalog = Catalog.from_file(CATALOG_FILE)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if _catalog is None:
+            raise
+        # Keep serving the last good catalog until the file is fixed
+        print(f"Unit catalog reload failed, keeping v{_catalog.version}: {e}")
+    else:
+        _catalog = catalog
+        print(f"Loaded unit catalog v{catalog.version} ({len(catalog.units)} units)")
+    _mtime = mtime
+
+
+def _check_for_changes():
+    global _checking
+    try:
+        _load()
+    except Exception as e:
+        print(f"Unit catalog check failed: {e}")
+    finally:
+        _checking = False
+
+
+def get_catalog():
+    """The current catalog, reloaded if units.json changed since it was read.
+
+    Only the first call reads the file (at startup, see setup_commands); after
+    that the file is checked on a background thread every few seconds, so
+    command handlers and autocomplete never wait on disk.
+    """
+    global _next_check, _checking
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _load()
+        _next_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+        return _catalog
+    now = time.monotonic()
+    if now >= _next_check:
+        with _lock:
+            if now >= _next_check and not _checking:
+                _next_check = now + RELOAD_CHECK_INTERVAL
+                _checking = True
+                threading.Thread(target=_check_for_changes, daemon=True).start()
+    return _catalog
+
+
+def all_units():
+    return get_catalog().units
+
+
+def get_unit(unit_id):
+    return get_catalog().by_id[unit_id]
+
+
+def find_units(name, stars=None):
+    """Units whose name matches `name` case-insensitively (optionally of one star tier)."""
+    units = get_catalog().by_name.get(name.strip().casefold(), ())
+    return units if stars is None else tuple(u for u in units if u.stars == stars)
+
+
+def complete_units(prefix, limit=25, unit_ids=None):
+    return get_catalog().complete(prefix, limit, unit_ids)
+
+
+def resolve_unit(stack):
+    """Expand a compact inventory stack into a full unit dict with its buffed stats."""
+    return get_unit(stack.unit_id).to_dict(stack.delta)
+
+
+def compact_units(units, dropped=None):
+    """Convert legacy full unit dicts into compact stacks holding only stat deltas.
+
+    A unit missing from the catalog raises ValueError, unless a `dropped` list
+    is given to collect it instead.
+    """
+    stacks = []
+    for unit in units:
+        template = next(iter(find_units(str(unit.get("name", "")), unit.get("stars"))), None)
+        if template is None:
+            if dropped is None:
+                raise ValueError(f"Unknown unit: {unit.get('name')} ({unit.get('stars')}⭐)")
+            dropped.append(unit)
+            continue
+        delta = [unit["stats"].get(stat, base) - base for stat, base in zip(STATS, template.stats)]
+        stacks.append(UnitStack(template.id, 1, delta))
+    return normalize(stacks)
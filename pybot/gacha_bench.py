@@ -0,0 +1,128 @@
+"""Monte Carlo check of the summon odds and sampler speed.
+
+Runs many pulls through the bot's real sampler and compares the observed rate
+of every star tier and unit with the advertised odds. Each rate gets a
+confidence interval. Also reports pulls per second for single draws (the
+summon buttons) and for batched draws (/mass_summon). The bot doesn't need to
+be running.
+
+    python gacha_bench.py [--pulls 2000000] [--batch 1000] [--z 3.29] [--seed N]
+
+Exits with status 1 if any advertised rate falls outside its interval.
+"""
+import sys
+import math
+import time
+import random
+import argparse
+from discord_commands import gacha_sampler
+from discord_commands.gacha_sampler import STAR_RATES, FALLBACK_STARS, get_sampler, get_random_unit, summon_counts, unit_odds
+
+
+def wilson_interval(hits, n, z):
+    """Wilson score interval for a binomial rate; stays sensible for rare units."""
+    if n == 0:
+        return 0.0, 1.0
+    p = hits / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def advertised_odds(units):
+    """{stars: probability} worked out straight from STAR_RATES, independently of the sampler.
+
+    A tier's rate is split evenly between its units; tiers with no units and
+    any shortfall of the rates below 1 go to the fallback tier.
+    """
+    tiers = {unit.stars for unit in units}
+    odds = {stars: 0.0 for stars in tiers}
+    for stars, rate in STAR_RATES:
+        odds[stars if stars in tiers else FALLBACK_STARS] += rate
+    odds[FALLBACK_STARS] += max(0.0, 1.0 - sum(rate for _, rate in STAR_RATES))
+    return odds
+
+
+def time_single(pulls, rng):
+    counts = {}
+    started = time.perf_counter()
+    for _ in range(pulls):
+        unit = get_random_unit() if rng is None else get_sampler().draw(rng)
+        counts[unit.id] = counts.get(unit.id, 0) + 1
+    return counts, time.perf_counter() - started
+
+
+def time_batched(pulls, batch, rng):
+    counts = {}
+    started = time.perf_counter()
+    done = 0
+    sampler = get_sampler()
+    while done < pulls:
+        n = min(batch, pulls - done)
+        if rng is None:
+            drawn = summon_counts(n)
+        else:
+            drawn = {unit.id: c for unit, c in zip(sampler.items, sampler.counts(n, rng)) if c}
+        for unit_id, count in drawn.items():
+            counts[unit_id] = counts.get(unit_id, 0) + count
+        done += n
+    return counts, time.perf_counter() - started
+
+
+def report(label, counts, pulls, elapsed, z):
+    """Print the frequency tables for one run; returns how many rates fell outside their interval."""
+    print(f"\n{label}: {pulls:,} pulls in {elapsed:.2f}s ({pulls / max(elapsed, 1e-9):,.0f} pulls/s)")
+    misses = 0
+    units = [unit for unit, _ in unit_odds()]
+    star_odds = advertised_odds(units)
+    tier_sizes = {}
+    for unit in units:
+        tier_sizes[unit.stars] = tier_sizes.get(unit.stars, 0) + 1
+    rows = []
+    by_stars = {}
+    for unit in units:
+        hits = counts.get(unit.id, 0)
+        by_stars[unit.stars] = by_stars.get(unit.stars, 0) + hits
+        rows.append((f"{unit.name} ({unit.stars}⭐)", star_odds[unit.stars] / tier_sizes[unit.stars], hits))
+    star_rows = [(f"{stars}⭐", p, by_stars.get(stars, 0)) for stars, p in sorted(star_odds.items())]
+    for title, table in (("Per star", star_rows), ("Per unit", rows)):
+        print(f"  {title:<24} {'expected':>9} {'observed':>9} {'interval':>21}")
+        for name, p, hits in table:
+            low, high = wilson_interval(hits, pulls, z)
+            ok = low <= p <= high
+            misses += not ok
+            print(f"  {name:<24} {p:>9.4%} {hits / pulls:>9.4%} [{low:>8.4%}, {high:>8.4%}]{'' if ok else '  <-- outside'}")
+    return misses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check summon odds and sampler throughput by simulation.")
+    parser.add_argument("--pulls", type=int, default=2_000_000, help="Pulls per run (default: %(default)s)")
+    parser.add_argument("--batch", type=int, default=1000, help="Pulls per batched draw, like one /mass_summon (default: %(default)s)")
+    parser.add_argument("--z", type=float, default=3.29, help="z-score of the intervals; 3.29 is ~99.9%% (default: %(default)s)")
+    parser.add_argument("--seed", type=int, help="Seed a private RNG so a run can be repeated")
+    parser.add_argument("--skip-single", action="store_true", help="Only time batched draws")
+    args = parser.parse_args(argv)
+
+    total = sum(rate for _, rate in STAR_RATES)
+    print(f"STAR_RATES sum to {total!r}; {max(0.0, 1.0 - total):.2e} falls back to {FALLBACK_STARS}⭐")
+    print(f"{len(unit_odds())} units in the pool, NumPy multinomial for batches of {gacha_sampler.NUMPY_MIN_PULLS}+ pulls")
+    rng = random.Random(args.seed) if args.seed is not None else None
+
+    misses = 0
+    if not args.skip_single:
+        counts, elapsed = time_single(args.pulls, rng)
+        misses += report("Single draws", counts, args.pulls, elapsed, args.z)
+    counts, elapsed = time_batched(args.pulls, args.batch, rng)
+    misses += report(f"Batched draws ({args.batch} per batch)", counts, args.pulls, elapsed, args.z)
+
+    if misses:
+        print(f"\n{misses} rate(s) outside their interval")
+        return 1
+    print("\nAll observed rates match the advertised odds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
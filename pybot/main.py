@@ -5,6 +5,7 @@ import os
 import threading
 from keep_alive import keep_alive
 from commands import setup_commands
+from discord_commands import storage
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
@@ -125,6 +126,8 @@ def main():
     finally:
         observer.stop()
         observer.join()
+        # Write back any cached game state before exiting
+        storage.stop_background_flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
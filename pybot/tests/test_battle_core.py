@@ -0,0 +1,99 @@
+"""Battle rules in battle_core, checked against the /fight code they came from.
+
+data/battle_replay.json holds the battle logs that the original /fight code
+(BattleUnit and Battle inside battle_commands.py, before battle_core existed)
+wrote for every pair of catalog units, and for Michael Saves against every
+unit as a saved boss, with spells cast on a fixed schedule under a fixed seed.
+battle_core has to reproduce each log line for line, with the same final HP.
+
+    cd pybot && python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import random
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from discord_commands import battle_core
+from discord_commands.battle_core import Battle, BattleUnit, format_event, resolve, simulate
+from discord_commands.unit_catalog import get_unit
+
+REPLAY_FILE = os.path.join(os.path.dirname(__file__), "data", "battle_replay.json")
+REPLAY_TURNS = 40  # Turns each replay runs for at most
+
+
+def boss_data(unit_id):
+    # A boss row saved before effect ids existed: stats x10, no passives/spell_effects
+    boss = get_unit(unit_id).to_dict()
+    del boss["passives"], boss["spell_effects"]
+    boss["stats"] = {stat: value * 10 for stat, value in boss["stats"].items()}
+    return boss
+
+
+def replay(unit1, unit2, seed):
+    """Click through one /fight: on some turns Spell (twice, the second is refused), then Attack."""
+    random.seed(seed)
+    battle = Battle(BattleUnit(unit1), BattleUnit(unit2))
+    for turn in range(REPLAY_TURNS):
+        unit = battle.units[battle.turn]
+        if unit.spells and turn % 3 == seed % 3:
+            unit.use_spell(battle, turn % len(unit.spells))
+            unit.use_spell(battle, 0)
+        if battle.next_turn() is not None:
+            break
+    return [format_event(e) for e in battle.log], [u.current_hp for u in battle.units]
+
+
+class ReplayTest(unittest.TestCase):
+
+    def test_matches_original_fight(self):
+        with open(REPLAY_FILE, "r", encoding="utf-8") as f:
+            cases = json.load(f)
+        # Keep the whole log; the bot only needs the last few events
+        with mock.patch.object(battle_core, "LOG_SIZE", 10_000):
+            for case in cases:
+                unit1 = get_unit(case["unit1"]).to_dict()
+                unit2 = boss_data(case["unit2"]) if case["boss"] else get_unit(case["unit2"]).to_dict()
+                with self.subTest(unit1=case["unit1"], unit2=case["unit2"], boss=case["boss"], seed=case["seed"]):
+                    log, hp = replay(unit1, unit2, case["seed"])
+                    self.assertEqual(log, case["log"])
+                    self.assertEqual(hp, case["hp"])
+
+
+class ResolveTest(unittest.TestCase):
+
+    def test_resolve_plays_the_same_turns_as_attack_clicks(self):
+        for unit1, unit2 in (("dragon", "knight"), ("amongus", "elon_musk"), ("michael_saves", "shrek")):
+            random.seed(5)
+            clicked = Battle(BattleUnit(get_unit(unit1).to_dict()), BattleUnit(get_unit(unit2).to_dict()))
+            winner = None
+            turns = []
+            while winner is None:
+                attacker = clicked.units[clicked.turn]
+                defender = clicked.units[1 - clicked.turn]
+                before = defender.current_hp
+                winner = clicked.next_turn()
+                turns.append((len(turns) + 1, attacker.name, defender.name, before - defender.current_hp, defender.current_hp))
+            random.seed(5)
+            resolved = Battle(BattleUnit(get_unit(unit1).to_dict()), BattleUnit(get_unit(unit2).to_dict()))
+            self.assertEqual(resolve(resolved), (winner, turns))
+            self.assertEqual(list(resolved.log), list(clicked.log))
+
+    def test_simulate_is_repeatable_with_a_seed(self):
+        unit1 = get_unit("elon_musk").to_dict()
+        unit2 = get_unit("amongus").to_dict()
+        random.seed(11)
+        first = [simulate(unit1, unit2) for _ in range(50)]
+        random.seed(11)
+        self.assertEqual([simulate(unit1, unit2) for _ in range(50)], first)
+
+    def test_turn_limit_is_a_draw(self):
+        # Sticky Body takes a Slime's whole attack, so neither side can win
+        slime = get_unit("slime").to_dict()
+        self.assertEqual(simulate(slime, slime, use_spells=False, max_turns=10), (None, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()